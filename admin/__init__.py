@@ -1,9 +1,9 @@
 from flask import Blueprint
 
+# No url_prefix: the staff pages keep their original top-level URLs
 admin_bp = Blueprint(
     "admin",
     __name__,
-    url_prefix="/admin",
     template_folder="../templates"
 )
 
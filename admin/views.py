@@ -1,8 +1,135 @@
 from . import admin_bp
-from flask import redirect, url_for
-from auth_helpers import admin_required
+import re
+from flask import flash, redirect, render_template, request, url_for
+from auth_helpers import admin_required, login_user
+from exports import stream_export
+from extensions import db
+from metrics import metrics_access, metrics_response
+from models import User
+from pages import render_static_page
+from rate_limit import rate_limited
+import server_session
 
-@admin_bp.route("/")
+@admin_bp.route("/admin/")
 @admin_required
 def dashboard():
-    return redirect(url_for("rgsq_staff_html"))
+    return redirect(url_for("admin.rgsq_staff_html"))
+
+@admin_bp.route("/admin/members.<any(csv, ndjson):fmt>")
+@admin_required
+def export_members(fmt):
+    """All users, or only those at ?membership=<level>."""
+    stmt = (db.select(User.id, User.email, User.full_name, User.membership, User.role, User.is_active)
+            .order_by(User.id.asc()))
+    membership = (request.args.get("membership") or "").strip().lower()
+    if membership:
+        stmt = stmt.where(User.membership == membership)
+    # the filter value is user input; only a slug of it goes into the Content-Disposition header
+    slug = re.sub(r"[^a-z0-9]+", "-", membership).strip("-")[:40]
+    return stream_export(stmt, fmt, f"members-{slug}" if slug else "members")
+
+@admin_bp.post("/admin/sessions/revoke")
+@admin_required
+def revoke_user_sessions():
+    """Log a user out on every device (also `flask sessions revoke EMAIL`)."""
+    email = (request.form.get("email") or "").strip().lower()
+    u = User.query.filter_by(email=email).first()
+    if server_session.server_side_store() is None:
+        flash("Sessions live in signed cookies (SESSION_BACKEND='cookie'), so they cannot be revoked.", "warning")
+    elif u is None:
+        flash(f"No user with email {email}.", "warning")
+    else:
+        revoked = server_session.revoke_user_sessions(u.id)
+        flash(f"Signed {u.email} out of {revoked} session(s).", "success")
+    return redirect(url_for("admin.rgsq_staff_html"))
+
+@admin_bp.route("/metrics")
+@metrics_access
+def prometheus_metrics():
+    """Request, template and SQL timings in the Prometheus text format (SMTP: see METRICS_TEXTFILE)."""
+    return metrics_response()
+
+# -----------------------------
+# Admin Center (signup/login)
+# -----------------------------
+ADMIN_INVITE_CODE = "TEAM305"
+
+@admin_bp.route("/admin/signup", methods=["GET", "POST"])
+@rate_limited("signup")
+def admin_signup():
+    active_tab = request.args.get("tab")
+    if request.method == "POST":
+        code = (request.form.get("code") or "").strip()
+        email = (request.form.get("email") or "").strip().lower()
+        full_name = (request.form.get("full_name") or "").strip()
+        password = (request.form.get("password") or "")
+        password2 = (request.form.get("password2") or "")
+        if code != ADMIN_INVITE_CODE:
+            flash("Invalid invite code.", "danger")
+            return render_template("admin_signup.html", active_tab="signup")
+        if not email or "@" not in email:
+            flash("Please enter a valid email.", "warning")
+            return render_template("admin_signup.html", active_tab="signup")
+        if len(password) < 8:
+            flash("Password must be at least 8 characters.", "warning")
+            return render_template("admin_signup.html", active_tab="signup")
+        if password != password2:
+            flash("Passwords do not match.", "warning")
+            return render_template("admin_signup.html", active_tab="signup")
+        if User.query.filter_by(email=email).first():
+            flash("This email is already registered.", "warning")
+            return render_template("admin_signup.html", active_tab="signup")
+        u = User(email=email, full_name=full_name or None)
+        u.set_password(password)
+        u.role = "admin"
+        u.is_active = True
+        db.session.add(u)
+        db.session.commit()
+        login_user(u)
+        flash("Admin account created.", "success")
+        return redirect(url_for("admin.rgsq_staff_html"))
+    return render_template("admin_signup.html", active_tab=active_tab or "signup")
+
+@admin_bp.route("/admin/login", methods=["GET", "POST"])
+@rate_limited("login")
+def admin_login():
+    if request.method == "POST":
+        email = (request.form.get("email") or "").strip().lower()
+        password = (request.form.get("password") or "")
+        u = User.query.filter_by(email=email).first()
+        if not u or not u.check_password(password):
+            flash("Invalid email or password.", "danger")
+            return render_template("admin_signup.html", active_tab="login")
+        if (u.role or "member").lower() not in ("admin", "staff"):
+            flash("You do not have admin access.", "danger")
+            return render_template("admin_signup.html", active_tab="login")
+        if not u.is_active:
+            flash("This account is disabled.", "warning")
+            return render_template("admin_signup.html", active_tab="login")
+        db.session.commit()  # keeps an upgraded password hash
+        login_user(u)
+        flash("Welcome back.", "success")
+        return redirect(url_for("admin.rgsq_staff_html"))
+    return render_template("admin_signup.html", active_tab="login")
+
+# -----------------------------
+# Staff pages (admin only)
+# -----------------------------
+@admin_bp.route("/RGSQStaff.html")
+@admin_required
+def rgsq_staff_html():
+    return render_static_page("RGSQStaff.html")
+
+@admin_bp.route("/StaffMembersOverview.html")
+@admin_required
+def staff_members_overview():
+    return render_static_page("StaffMembersOverview.html")
+
+@admin_bp.route("/StaffMembersList.html")
+@admin_required
+def staff_members_list():
+    return render_static_page("StaffMembersList.html")
+
+@admin_bp.route('/StaffMembersCount.html')
+def staff_members_count():
+    return render_static_page("StaffMembersCount.html")
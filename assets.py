@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+import json
+import os
+
+try:  # Brotli is optional: without it only .gz siblings are produced
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+MANIFEST_NAME = "assets-manifest.json"
+
+FINGERPRINT_EXTENSIONS = {
+    ".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".woff", ".woff2",
+}
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+# uploads/ is managed by the app at runtime and is content-addressed already
+SKIP_DIRS = {"uploads"}
+
+
+def fingerprinted_name(rel_path, digest):
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest[:12]}{ext}"
+
+
+def iter_assets(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        rel_root = os.path.relpath(root, static_folder)
+        if rel_root == ".":
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            if os.path.splitext(name)[1].lower() in FINGERPRINT_EXTENSIONS:
+                rel = os.path.normpath(os.path.join(rel_root, name)).replace(os.sep, "/")
+                yield rel, os.path.join(root, name)
+
+
+def precompress(path, data):
+    """Write .gz (and .br when available) siblings of a text asset, if they are smaller."""
+    written = []
+    variants = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda d: brotli.compress(d, quality=11)))
+    for suffix, compress in variants:
+        packed = compress(data)
+        if len(packed) < len(data):
+            with open(path + suffix, "wb") as f:
+                f.write(packed)
+            written.append(suffix)
+    return written
+
+
+def build_manifest(static_folder):
+    """Fingerprint every asset under static_folder and write the manifest.
+
+    Returns {"css/style.css": "css/style.<hash>.css", ...}. Files are not copied;
+    the static view maps fingerprinted names back to the original file.
+    """
+    manifest = {}
+    for rel, path in sorted(iter_assets(static_folder)):
+        with open(path, "rb") as f:
+            data = f.read()
+        manifest[rel] = fingerprinted_name(rel, hashlib.sha256(data).hexdigest())
+        if os.path.splitext(rel)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            precompress(path, data)
+    with open(os.path.join(static_folder, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
@@ -0,0 +1,9 @@
+from flask import Blueprint
+
+auth_bp = Blueprint(
+    "auth",
+    __name__,
+    template_folder="../templates"
+)
+
+from . import views  # noqa
@@ -0,0 +1,105 @@
+from . import auth_bp
+from flask import flash, g, redirect, render_template, request, session, url_for
+from auth_helpers import login_user
+from extensions import db
+from mail import queue_welcome_email
+from rate_limit import rate_limited
+from models import User
+
+# -----------------------------
+# Membership levels (for register flow)
+# -----------------------------
+MEMBERSHIP_LEVELS = {
+    "household": {"name": "Household Bundle", "price": "$90.00 (AUD)",
+                  "desc": "Bundle (up to 5 members). 1-year subscription; no automatic recurring payments."},
+    "ordinary":  {"name": "Ordinary Member", "price": "$70.00 (AUD)",
+                  "desc": "1-year subscription; no automatic recurring payments."},
+    "school":    {"name": "School/Educational Institution", "price": "$85.00 (AUD)",
+                  "desc": "1-year subscription; one voting representative."},
+    "student":   {"name": "Student", "price": "",
+                  "desc": "1-year subscription; full-time students in Australia."},
+    "under35":   {"name": "Under 35s", "price": "$35.00 (AUD)",
+                  "desc": "1-year subscription; same voting rights as ordinary members."},
+    "youth":     {"name": "Youth", "price": "",
+                  "desc": "1-year subscription; under 18s require parental consent."},
+}
+
+# -----------------------------
+# Auth (member)
+# -----------------------------
+@auth_bp.route("/Login.html", methods=["GET", "POST"])
+@rate_limited("login")
+def login():
+    if request.method == "POST":
+        email = (request.form.get("email") or "").strip().lower()
+        password = (request.form.get("password") or "")
+        u = User.query.filter_by(email=email).first()
+        if u and u.check_password(password):
+            db.session.commit()  # keeps an upgraded password hash
+            login_user(u)
+            flash("Login successful.", "success")
+            return redirect(url_for("public.Home"))
+        flash("Invalid email or password.", "danger")
+    return render_template("Login.html")
+
+@auth_bp.route("/logout")
+def logout():
+    session.clear()
+    g.pop("current_user", None)
+    flash("Logged out.", "info")
+    return redirect(url_for("public.Home"))
+
+
+@auth_bp.route("/register", methods=["GET", "POST"])
+@rate_limited("signup")
+def register_account():
+    # GET: arrived from Join page with ?membership=xxx
+    if request.method == "GET":
+        level_key = (request.args.get("membership") or "").strip().lower()
+        if level_key not in MEMBERSHIP_LEVELS:
+            flash("Please select a membership level first.", "warning")
+            return redirect(url_for("public.join_rgsq"))
+        return render_template("register.html", level_key=level_key, level=MEMBERSHIP_LEVELS[level_key])
+
+    # POST: create account
+    email = (request.form.get("email") or "").strip().lower()
+    # accept both "fullName" (template default) and "fullname" (fallback)
+    fullname = (request.form.get("fullName") or request.form.get("fullname") or "").strip()
+    password = (request.form.get("password") or "")
+    membership = (request.form.get("membership") or "").strip().lower()
+
+    # basic validation
+    if not email or "@" not in email:
+        flash("Please enter a valid email.", "warning")
+        level = MEMBERSHIP_LEVELS.get(membership)
+        return render_template("register.html", level_key=membership, level=level)
+
+    if len(password) < 6:
+        flash("Password must be at least 6 characters.", "warning")
+        level = MEMBERSHIP_LEVELS.get(membership)
+        return render_template("register.html", level_key=membership, level=level)
+
+    if User.query.filter_by(email=email).first():
+        flash("This email is already registered.", "warning")
+        level = MEMBERSHIP_LEVELS.get(membership)
+        return render_template("register.html", level_key=membership, level=level)
+
+    # create user with selected membership
+    u = User(
+        email=email,
+        full_name=fullname or None,
+        membership=membership if membership in MEMBERSHIP_LEVELS else None
+    )
+    u.set_password(password)
+    u.role = "member"   # ensure public signups are members
+    u.is_active = True
+
+    db.session.add(u)
+    # welcome email goes out via the outbox, committed together with the account
+    display_name = MEMBERSHIP_LEVELS.get(membership, {}).get("name", "member")
+    queue_welcome_email(u.email, display_name)
+    db.session.commit()
+
+    flash("Account created. A welcome email is on its way.", "success")
+
+    return redirect(url_for("public.Home"))
@@ -1,6 +1,55 @@
 from functools import wraps
-from flask import session, redirect, url_for, flash
-from main import User
+from flask import current_app, g, session, redirect, url_for, flash, make_response
+from extensions import db
+from http_cache import CACHE_POLICIES
+from models import User
+from server_session import rotate_session
+
+def reset_current_user():
+    # g can outlive a request when an app context is already pushed (tests, CLI)
+    g.pop("current_user", None)
+
+def get_current_user():
+    """Return the logged-in User, loading it at most once per request."""
+    if "current_user" not in g:
+        uid = session.get("user_id")
+        g.current_user = db.session.get(User, uid) if uid else None
+    return g.current_user
+
+def user_display_name(u):
+    return (u.full_name or "").strip() or u.email.split("@")[0]
+
+def login_user(u):
+    """Start a session for u and snapshot the fields the navbar needs."""
+    rotate_session()
+    session["user_id"] = u.id
+    session["user_email"] = u.email
+    if current_app.config["SESSION_USER_SNAPSHOT"]:
+        session["user_role"] = u.role or "member"
+        session["user_name"] = user_display_name(u)
+    g.current_user = u
+
+def is_member_user():
+    u = get_current_user()
+    if not u:
+        return False
+    role = (u.role or "").lower()
+    return role in ("member", "admin", "staff")
+
+def inject_user_flags():
+    """Context processor: navbar name and admin flag, from the session snapshot when possible."""
+    name = None
+    is_admin = False
+    if session.get("user_id"):
+        if "current_user" not in g and current_app.config["SESSION_USER_SNAPSHOT"] and "user_role" in session:
+            name = session.get("user_name")
+            role = session["user_role"]
+        else:
+            u = get_current_user()
+            name = user_display_name(u) if u else None
+            role = (u.role or "member") if u else "member"
+        is_admin = role.lower() in ("admin", "staff")
+    return {"current_user_name": name, "is_admin": is_admin}
 
 def login_required(view):
     """Require an authenticated user via session['user_id'].""" 
@@ -8,22 +57,24 @@ def login_required(view):
     def wrapper(*a, **kw):
         if not session.get("user_id"):
             flash("Please login first.", "warning")
-            return redirect(url_for("login"))
+            return redirect(url_for("auth.login"))
         return view(*a, **kw)
     return wrapper
 
 def admin_required(view):
-    """Allow only 'admin' or 'staff' roles to access the view."""
+    """Allow only 'admin' or 'staff' roles to access the view; responses are never cached."""
     @wraps(view)
     def wrapper(*a, **kw):
         uid = session.get("user_id")
         if not uid:
             flash("Please login first.", "warning")
-            return redirect(url_for("login"))
-        u = User.query.get(uid)
+            return redirect(url_for("auth.login"))
+        u = get_current_user()
         role = (getattr(u, "role", "member") or "member").lower() if u else "member"
         if role not in ("admin", "staff"):
             flash("Insufficient permissions.", "danger")
-            return redirect(url_for("Home"))
-        return view(*a, **kw)
+            return redirect(url_for("public.Home"))
+        resp = make_response(view(*a, **kw))
+        resp.headers["Cache-Control"] = CACHE_POLICIES["admin"]
+        return resp
     return wrapper
@@ -0,0 +1,73 @@
+"""Password verifications (logins) per second per core for each hash method.
+
+Times check_password on one core for each method, then runs a login burst
+through the app's hashing pool with more request threads than pool processes:
+
+    python benchmarks/password_hashing.py --seconds 3 --threads 16
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import passwords  # noqa: E402
+
+METHODS = ("pbkdf2:sha256:600000", "pbkdf2:sha256:200000", "scrypt:32768:8:1", "bcrypt:12", "bcrypt:10")
+
+
+def per_core(method, seconds):
+    stored = passwords._hash("correct horse", method)
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        assert passwords._verify(stored, "correct horse")
+        done += 1
+    return done / (time.perf_counter() - start)
+
+
+def burst(method, workers, threads, seconds):
+    from main import create_app
+
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite://", "MIGRATE_ON_START": True,
+                      "PASSWORD_HASH_METHOD": method, "PASSWORD_HASH_WORKERS": workers})
+    with app.app_context():
+        stored = passwords.hash_password("correct horse")  # also starts the pool
+    counts, busy = [0] * threads, [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def login(i):
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                try:
+                    assert passwords.verify_password(stored, "correct horse")
+                    counts[i] += 1
+                except passwords.PasswordHasherBusy:
+                    busy[i] += 1
+
+    pool = [threading.Thread(target=login, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return sum(counts) / seconds, sum(busy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} cores")
+    for method in METHODS:
+        print(f"{method:22} logins/s per core {per_core(method, args.seconds):8.1f}")
+    rate, busy = burst(passwords.DEFAULT_PASSWORD_HASH_METHOD, args.workers, args.threads, args.seconds)
+    print(f"pool of {args.workers}, {args.threads} request threads: logins/s {rate:.1f}, "
+          f"refused (503) {busy}")
+
+
+if __name__ == "__main__":
+    main()
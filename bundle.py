@@ -0,0 +1,116 @@
+import os
+import re
+
+# Bootstrap 5.3.2 as shipped inside Bootstrap-Flask (already in requirements.txt),
+# so building the bundle needs no network access
+try:
+    import flask_bootstrap
+    VENDOR_DIR = os.path.join(os.path.dirname(flask_bootstrap.__file__), "static", "bootstrap5")
+except ImportError:  # pragma: no cover
+    VENDOR_DIR = None
+
+BUNDLE_DIR = "dist"
+SITE_CSS = f"{BUNDLE_DIR}/site.css"
+SITE_JS = f"{BUNDLE_DIR}/site.js"
+CRITICAL_CSS = f"{BUNDLE_DIR}/critical.css"
+
+# What the shared navbar needs before the full stylesheet arrives. A rule is
+# critical only if every class in its selector is listed here, so compound
+# rules such as ".btn-check:checked+.btn" stay in the deferred stylesheet.
+CRITICAL_ELEMENTS = {"*", "html", "body", "img", "a", "ul", "ol", "h1", "h2", "p", "button"}
+CRITICAL_CLASS_PREFIXES = ("navbar", "nav-", "container", "dropdown")
+CRITICAL_CLASSES = {
+    "collapse", "show", "sticky-top", "shadow-sm", "bg-light", "d-flex", "flex-column",
+    "min-vh-100", "me-auto", "mb-2", "mb-lg-0",
+}
+
+
+def minify_css(css):
+    """Whitespace/comment minifier; license comments (/*! ... */) are kept."""
+    css = re.sub(r"/\*(?!!).*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r"\s*:\s*(?=[^{}]*})", ":", css)  # only inside declaration blocks
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+def split_blocks(css):
+    """Split CSS into top-level (prelude, body) pairs, keeping nested @media bodies intact."""
+    blocks, depth, start, prelude = [], 0, 0, None
+    for i, ch in enumerate(css):
+        if ch == "{":
+            if depth == 0:
+                prelude = css[start:i].strip()
+                start = i + 1
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                blocks.append((prelude, css[start:i]))
+                start = i + 1
+        elif ch == ";" and depth == 0:
+            start = i + 1  # @charset / @import statements
+    return blocks
+
+
+def _class_is_critical(name):
+    return name in CRITICAL_CLASSES or name.startswith(CRITICAL_CLASS_PREFIXES)
+
+
+def _selector_is_critical(selector):
+    for part in selector.split(","):
+        part = part.strip()
+        if part.startswith((":root", "[data-bs-theme=light]")):
+            return True
+        classes = re.findall(r"\.([\w-]+)", part)
+        if classes:
+            if all(_class_is_critical(c) for c in classes):
+                return True
+            continue
+        head = re.split(r"[\s>+~:#\[]", part, maxsplit=1)[0]
+        if head in CRITICAL_ELEMENTS and (part == head or part[len(head)] in " :"):
+            return True
+    return False
+
+
+def extract_critical(css):
+    out = []
+    for prelude, body in split_blocks(css):
+        if prelude.startswith("@media"):
+            inner = extract_critical(body)
+            if inner:
+                out.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            continue  # @font-face, @keyframes, @supports: not needed for first paint
+        elif _selector_is_critical(prelude):
+            out.append(f"{prelude}{{{body}}}")
+    return "".join(out)
+
+
+def build_bundle(static_folder):
+    """Write dist/site.css, dist/site.js and dist/critical.css under static_folder."""
+    if VENDOR_DIR is None:
+        raise RuntimeError("Bootstrap-Flask is not installed")
+    with open(os.path.join(VENDOR_DIR, "css", "bootstrap.min.css"), encoding="utf-8") as f:
+        bootstrap_css = f.read()
+    with open(os.path.join(static_folder, "css", "style.css"), encoding="utf-8-sig") as f:
+        site_css = minify_css(f.read())
+    css = bootstrap_css.rstrip() + "\n" + site_css + "\n"
+
+    js_parts = []
+    for rel in (("umd", "popper.min.js"), ("js", "bootstrap.min.js")):
+        with open(os.path.join(VENDOR_DIR, *rel), encoding="utf-8") as f:
+            # drop sourceMappingURL comments, the maps are not shipped
+            js_parts.append(re.sub(r"//# sourceMappingURL=\S+\s*$", "", f.read()).rstrip())
+    js = ";\n".join(js_parts) + "\n"
+
+    critical = extract_critical(minify_css(bootstrap_css)) + extract_critical(site_css)
+
+    os.makedirs(os.path.join(static_folder, BUNDLE_DIR), exist_ok=True)
+    sizes = {}
+    for rel, content in ((SITE_CSS, css), (SITE_JS, js), (CRITICAL_CSS, critical)):
+        with open(os.path.join(static_folder, rel), "w", encoding="utf-8") as f:
+            f.write(content)
+        sizes[rel] = len(content.encode("utf-8"))
+    return sizes
@@ -0,0 +1,192 @@
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_set_header
+
+try:  # Brotli is optional: without it responses are only gzipped
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Set by views whose bytes are fully determined by their ETag (the render cache),
+# so the compressed bytes can be kept and reused instead of recompressed
+CACHE_KEY_ENVIRON = "rgsq.compress_cache_key"
+
+
+def cache_compressed(etag):
+    """Let the compression layer reuse compressed bytes of this response for the same ETag."""
+    request.environ[CACHE_KEY_ENVIRON] = etag
+
+
+# -----------------------------
+# Encoders
+# -----------------------------
+def _compress(encoding, body, level):
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _compress_stream(encoding, chunks, level):
+    # flush after every chunk: a streamed export should reach the client as it is
+    # produced, not when the compressor's window happens to fill up
+    if encoding == "br":
+        c = brotli.Compressor(quality=level)
+        process, flush, finish = c.process, c.flush, c.finish
+    else:
+        c = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip framing
+        process, flush, finish = c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+    for chunk in chunks:
+        if chunk:
+            out = process(chunk) + flush()
+            if out:
+                yield out
+    yield finish()
+
+
+class CompressedBytesCache:
+    """LRU of compressed bodies keyed by (ETag, encoding), bounded by total size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+# -----------------------------
+# WSGI middleware
+# -----------------------------
+class CompressionMiddleware:
+    """gzip/Brotli response compression around the Flask app's wsgi_app.
+
+    Responses are compressed when the client accepts an encoding, the status is
+    a full 2xx, the content type is in COMPRESS_MIMETYPES and the body is at
+    least COMPRESS_MIN_SIZE bytes. Bodies without a Content-Length (streamed
+    exports) are compressed chunk by chunk as they are produced. Responses
+    already encoded (precompressed static files) or marked no-transform pass
+    through untouched.
+    """
+
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.min_size = config["COMPRESS_MIN_SIZE"]
+        self.mimetypes = frozenset(config["COMPRESS_MIMETYPES"])
+        self.levels = config["COMPRESS_LEVELS"]
+        self.cached_levels = config["COMPRESS_CACHED_LEVELS"]
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+        self.cache = CompressedBytesCache(config["COMPRESS_CACHE_BYTES"])
+
+    def negotiate(self, environ):
+        accept = parse_accept_header(environ.get("HTTP_ACCEPT_ENCODING"))
+        return accept.best_match(self.encodings)
+
+    def is_compressible(self, environ, status, headers):
+        code = int(status.split(None, 1)[0])
+        if not 200 <= code < 300 or code in (204, 206) or environ["REQUEST_METHOD"] == "HEAD":
+            return False
+        if "Content-Encoding" in headers or "no-transform" in headers.get("Cache-Control", ""):
+            return False
+        mimetype = headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+        if mimetype not in self.mimetypes:
+            return False
+        length = headers.get("Content-Length")
+        return length is None or int(length) >= self.min_size
+
+    def __call__(self, environ, start_response):
+        captured = []
+
+        def capture(status, headers, exc_info=None):
+            captured[:] = [status, headers, exc_info]
+            return lambda data: None  # Flask never uses write()
+
+        app_iter = self.wsgi_app(environ, capture)
+        status, headers, exc_info = captured
+        headers = Headers(headers)
+        encoding = self.negotiate(environ)
+
+        if status.startswith("304") and encoding:
+            _weaken_etag(headers)
+        if not self.is_compressible(environ, status, headers):
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return app_iter
+
+        _add_vary(headers, "Accept-Encoding")
+        if encoding is None:
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return app_iter
+
+        headers["Content-Encoding"] = encoding
+        _weaken_etag(headers)  # the compressed bytes are a different representation
+        if "Content-Length" not in headers:
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return _closing(_compress_stream(encoding, app_iter, self.levels[encoding]), app_iter)
+
+        cache_key = environ.get(CACHE_KEY_ENVIRON)
+        body = self.cache.get((cache_key, encoding)) if cache_key else None
+        if body is None:
+            try:
+                raw = b"".join(app_iter)
+            finally:
+                if hasattr(app_iter, "close"):
+                    app_iter.close()
+            if cache_key:
+                # compressed once per page version, so spend the time on the best ratio
+                body = _compress(encoding, raw, self.cached_levels[encoding])
+                self.cache.put((cache_key, encoding), body)
+            else:
+                body = _compress(encoding, raw, self.levels[encoding])
+        elif hasattr(app_iter, "close"):
+            app_iter.close()
+        headers["Content-Length"] = str(len(body))
+        start_response(status, headers.to_wsgi_list(), exc_info)
+        return [body]
+
+
+def _add_vary(headers, name):
+    vary = parse_set_header(headers.get("Vary"))
+    vary.add(name)
+    headers["Vary"] = vary.to_header()
+
+
+def _weaken_etag(headers):
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = "W/" + etag
+
+
+def _closing(chunks, app_iter):
+    try:
+        yield from chunks
+    finally:
+        if hasattr(app_iter, "close"):
+            app_iter.close()
+
+
+def init_app(app):
+    if app.config["COMPRESS_ENABLED"]:
+        app.wsgi_app = CompressionMiddleware(app.wsgi_app, app.config)
@@ -0,0 +1,55 @@
+from functools import wraps
+
+from flask import g
+from flask_sqlalchemy.session import Session
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.sql.dml import UpdateBase
+
+# SQLALCHEMY_BINDS key of the read replica engine (set from SQLALCHEMY_REPLICA_URI)
+REPLICA_BIND = "replica"
+
+# INSERT constructs with ON CONFLICT support; both take the same on_conflict_* arguments
+UPSERT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+class RoutingSession(Session):
+    """db.session that runs the queries of read_only views on the replica.
+
+    Flushes and INSERT/UPDATE/DELETE statements always use the primary, so a
+    read-only view that does write something still writes to the right place.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and g.get("db_read_only") and not self._flushing
+                and not isinstance(clause, UpdateBase)):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """Serve the view from the read replica, when one is configured.
+
+    The replica may lag the primary slightly, so only use this on public pages
+    where a few seconds of staleness is harmless.
+    """
+    @wraps(view)
+    def wrapper(*a, **kw):
+        g.db_read_only = True
+        try:
+            return view(*a, **kw)
+        finally:
+            # g can outlive a request when an app context is already pushed (tests, CLI)
+            g.pop("db_read_only", None)
+    return wrapper
+
+
+def upsert_insert(session, table):
+    """insert(table) for the session's backend, with on_conflict_do_update/do_nothing."""
+    dialect = session.get_bind(clause=table.insert()).dialect.name
+    try:
+        return UPSERT_INSERTS[dialect](table)
+    except KeyError:
+        raise NotImplementedError(f"no upsert support for the {dialect} backend") from None
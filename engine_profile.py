@@ -0,0 +1,53 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Applied to every new SQLite connection. WAL lets readers run while a worker
+# writes; with WAL, synchronous=NORMAL only fsyncs at checkpoints and cannot
+# corrupt the database (a power cut may lose the last commits, never old ones).
+SQLITE_PRAGMAS = {
+    "busy_timeout": 5000,            # ms to wait for a lock before "database is locked"; set first
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,            # KiB (negative) -> 16 MB page cache per connection
+    "mmap_size": 128 * 1024 * 1024,  # read pages straight from the OS page cache
+    "temp_store": "MEMORY",
+}
+
+
+def is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def engine_options(uri, pool_size=5, max_overflow=5, pool_timeout=10):
+    """SQLALCHEMY_ENGINE_OPTIONS for uri.
+
+    A worker needs one connection per thread that can touch the database
+    (request threads plus the image-derivative pool); in-memory SQLite uses a
+    single static connection, so no pool sizing applies there. Connections to
+    a database server are checked before use, since the server or a proxy in
+    between may have closed them while they sat in the pool.
+    """
+    backend = make_url(uri).get_backend_name()
+    if backend == "sqlite" and not is_sqlite_file(uri):
+        return {}
+    options = {"pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": pool_timeout}
+    if backend != "sqlite":
+        options["pool_pre_ping"] = True
+    return options
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run PRAGMA statements on each new DB-API connection of a file-backed SQLite engine."""
+    if not pragmas or engine.dialect.name != "sqlite" or not is_sqlite_file(engine.url):
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
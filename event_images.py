@@ -0,0 +1,149 @@
+import json
+import os
+from datetime import datetime
+
+import click
+from flask import current_app, url_for
+from flask.cli import with_appcontext
+from werkzeug.utils import secure_filename
+
+from db_backend import upsert_insert
+from extensions import db
+from models import Event, StoredImage
+from upload_store import (RETIRED_SUFFIX, discard_file, place_file, remove_files, restore_files, retire_files,
+                          store_stream)
+
+# image upload config
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+# -----------------------------
+# Image derivatives
+# -----------------------------
+_image_executor = None
+
+def build_event_image_variants(event_id: int) -> bool:
+    """Generate resized copies of an event's image and record them on the event."""
+    import image_pipeline  # Pillow is loaded on first use, not at start-up
+    ev = db.session.get(Event, event_id)
+    if ev is None or not ev.image or not image_pipeline.available():
+        return False
+    src = os.path.join(current_app.static_folder, ev.image)
+    stem = os.path.splitext(os.path.basename(ev.image))[0]
+    try:
+        variants = image_pipeline.generate_derivatives(src, current_app.config['DERIVED_IMAGE_FOLDER'], stem)
+    except Exception as e:
+        print(f"[IMAGE][ERROR] Could not build derivatives for event #{event_id} ({ev.image}): {e}")
+        return False
+    prefix = os.path.relpath(current_app.config['DERIVED_IMAGE_FOLDER'], current_app.static_folder).replace(os.sep, "/")
+    ev.image_variants = json.dumps({
+        fmt: {w: f"{prefix}/{name}" for w, name in sizes.items()}
+        for fmt, sizes in variants.items()
+    })
+    db.session.commit()
+    return True
+
+def _build_event_image_variants_in_background(app, event_id: int) -> None:
+    with app.app_context():
+        try:
+            build_event_image_variants(event_id)
+        finally:
+            db.session.remove()
+
+def schedule_image_derivatives(event_id: int) -> None:
+    """Build derivatives off the request thread (inline when IMAGE_DERIVATIVES_ASYNC is off)."""
+    global _image_executor
+    import image_pipeline
+    if not image_pipeline.available():
+        return
+    if not current_app.config["IMAGE_DERIVATIVES_ASYNC"]:
+        build_event_image_variants(event_id)
+        return
+    if _image_executor is None:
+        # started lazily, so a preloading master never forks with live threads
+        from concurrent.futures import ThreadPoolExecutor
+        _image_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-derivatives")
+    _image_executor.submit(_build_event_image_variants_in_background,
+                           current_app._get_current_object(), event_id)
+
+def store_event_image(file) -> str:
+    """Save an upload content-addressed and take a reference on it (committed by the caller).
+
+    Re-uploading identical bytes reuses the existing file, so uploads/ holds one
+    copy per distinct image and names never change, which makes them safe to cache forever.
+    """
+    ext = os.path.splitext(secure_filename(file.filename))[1].lower()
+    folder = current_app.config['UPLOAD_FOLDER']
+    sha256, size, tmp_path = store_stream(file.stream, folder)
+    images = StoredImage.__table__
+    try:
+        db.session.execute(
+            upsert_insert(db.session, images)
+            .values(sha256=sha256, path=f"uploads/{sha256}{ext}", size=size, ref_count=1,
+                    created_at=datetime.utcnow())
+            .on_conflict_do_update(index_elements=["sha256"], set_={"ref_count": images.c.ref_count + 1})
+        )
+        # same bytes first uploaded with another extension keep that name
+        path = db.session.execute(db.select(images.c.path).where(images.c.sha256 == sha256)).scalar_one()
+        # Placed only now that this transaction holds the row: a release that dropped
+        # the last reference took the file away before its commit, which this upsert
+        # waited for, so a copy put back here is never deleted under the new row.
+        place_file(tmp_path, os.path.join(folder, os.path.basename(path)))
+    except BaseException:
+        discard_file(tmp_path)
+        raise
+    return path
+
+def release_event_image(path, image_variants=None) -> bool:
+    """Drop one reference to an uploaded image; delete its files once nothing uses it."""
+    if not path:
+        return False
+    row = StoredImage.query.filter_by(path=path).first()
+    if row is None:  # legacy upload stored before content addressing
+        return False
+    sha256 = row.sha256
+    StoredImage.query.filter_by(sha256=sha256).update({"ref_count": StoredImage.ref_count - 1})
+    deleted = StoredImage.query.filter(StoredImage.sha256 == sha256, StoredImage.ref_count <= 0).delete()
+    if not deleted:
+        db.session.commit()
+        return False
+    files = [path]
+    if image_variants:
+        files += [p for sizes in json.loads(image_variants).values() for p in sizes.values()]
+    # Take the files out of service while the delete still holds the row, and only
+    # unlink them after it commits; a concurrent upload of the same bytes blocks on
+    # the row until then and puts its own copy back (see store_event_image).
+    retired = retire_files([os.path.join(current_app.static_folder, p) for p in files])
+    try:
+        db.session.commit()
+    except BaseException:
+        restore_files(retired)
+        raise
+    remove_files([p + RETIRED_SUFFIX for p in retired])
+    return True
+
+def event_image_srcset(ev, fmt: str) -> str:
+    """srcset value for an event's derived images in fmt ("webp"/"jpeg"), or "" if none yet."""
+    if not ev.image_variants:
+        return ""
+    sizes = json.loads(ev.image_variants).get(fmt) or {}
+    return ", ".join(
+        f"{url_for('static', filename=path)} {w}w"
+        for w, path in sorted(sizes.items(), key=lambda item: int(item[0]))
+    )
+
+@click.command("build-image-derivatives")
+@click.option("--all", "rebuild_all", is_flag=True, help="Rebuild events that already have derivatives.")
+@with_appcontext
+def build_image_derivatives_command(rebuild_all):
+    """Generate responsive image sizes for events that are missing them."""
+    import image_pipeline
+    if not image_pipeline.available():
+        raise click.ClickException("Pillow is not installed")
+    q = Event.query.filter(Event.image.isnot(None))
+    if not rebuild_all:
+        q = q.filter(Event.image_variants.is_(None))
+    built = sum(1 for ev_id, in q.with_entities(Event.id).all() if build_event_image_variants(ev_id))
+    print(f"[IMAGE] Built derivatives for {built} event(s)")
@@ -0,0 +1,9 @@
+from flask import Blueprint
+
+events_bp = Blueprint(
+    "events",
+    __name__,
+    template_folder="../templates"
+)
+
+from . import views  # noqa
@@ -0,0 +1,274 @@
+from . import events_bp
+from flask import current_app, flash, redirect, render_template, request, session, url_for
+from sqlalchemy import func
+from auth_helpers import admin_required, is_member_user, login_required
+from db_backend import read_only
+from event_images import allowed_file, release_event_image, schedule_image_derivatives, store_event_image
+from exports import stream_export
+from extensions import db
+from mail import queue_event_registration_email, queue_seat_available_email
+from models import (Event, Registration, SEARCH_RESULT_LIMIT, cancel_registration, parse_event_time, register_for_event,
+                    search_events)
+from pages import conditional_event_page
+from pagination import keyset_paginate
+
+# -----------------------------
+# Events (public)
+# -----------------------------
+@events_bp.route("/Eventlist.html")
+@read_only
+@conditional_event_page()
+def Eventlist():
+    per_page = 6
+    base_q = Event.query
+    if not is_member_user():
+        base_q = base_q.filter(Event.visibility == "public")
+    search_q = search_events(base_q, request.args.get("q"))
+    if search_q is not None:
+        pagination = None
+        events = search_q.limit(SEARCH_RESULT_LIMIT).all()
+    else:
+        pagination = keyset_paginate(
+            base_q, Event.starts_at, Event.id, per_page,
+            after=request.args.get("after"), before=request.args.get("before"),
+        )
+        events = pagination.items
+    return render_template("Eventlist.html", events=events, pagination=pagination,
+                           searched=search_q is not None)
+
+# -----------------------------
+# Admin-only pages / Event admin
+# -----------------------------
+@events_bp.route("/event_management.html")
+@admin_required
+def event_management():
+    per_page = 8
+
+    base_q = Event.query
+    search_q = search_events(base_q, request.args.get("q"))
+    if search_q is not None:
+        pagination = None
+        events = search_q.limit(SEARCH_RESULT_LIMIT).all()
+    else:
+        # no COUNT(*): the page's "has next" probe row is all the navigation needs
+        pagination = keyset_paginate(
+            base_q, Event.starts_at, Event.id, per_page,
+            after=request.args.get("after"), before=request.args.get("before"),
+        )
+        events = pagination.items
+
+    return render_template(
+        'event_management.html', 
+        events=events, 
+        pagination=pagination, 
+        searched=search_q is not None
+    )
+
+@events_bp.route("/events/<int:event_id>/stats")
+@admin_required
+def event_stats(event_id):
+    ev = Event.query.get_or_404(event_id)
+    day = func.date(Registration.registered_at)
+    rows = (db.session.query(day, func.count(Registration.id))
+            .filter(Registration.event_id == ev.id)
+            .group_by(day).order_by(day).all())
+    daily, total = [], 0
+    for d, count in rows:
+        total += count
+        daily.append({"day": str(d), "count": count, "total": total})
+    peak = max((r["count"] for r in daily), default=0)
+    return render_template("event_stats.html", ev=ev, daily=daily, peak=peak)
+
+@events_bp.route("/events/<int:event_id>/registrations.<any(csv, ndjson):fmt>")
+@admin_required
+def export_registrations(event_id, fmt):
+    ev = Event.query.get_or_404(event_id)
+    stmt = (db.select(Registration.id, Registration.email, Registration.status, Registration.registered_at)
+            .where(Registration.event_id == ev.id)
+            .order_by(Registration.id.asc()))
+    return stream_export(stmt, fmt, f"event-{ev.id}-registrations")
+
+@events_bp.post("/events/<int:event_id>/delete")
+@admin_required
+def delete_event(event_id):
+    ev = Event.query.get_or_404(event_id)
+    image, image_variants = ev.image, ev.image_variants
+    db.session.delete(ev)
+    db.session.commit()
+    release_event_image(image, image_variants)
+    flash("Event deleted.", "success")
+    return redirect(url_for("events.event_management"))
+
+@events_bp.route("/Create.html", methods=["GET", "POST"])
+@admin_required
+def Create():
+    if request.method == "POST":
+        title = (request.form.get("title") or "").strip()
+        event_time = (request.form.get("event_time") or request.form.get("date") or "").strip()
+        location = (request.form.get("location") or "").strip()
+        price_raw = (request.form.get("price") or "").strip()
+        capacity_raw = (request.form.get("total_tickets") or "").strip()
+        description = (request.form.get("description") or "").strip()
+        raw_vis = (request.form.get("visibility") or "").strip().lower()
+
+        file = request.files.get("image")
+        if file and file.filename:
+            if not allowed_file(file.filename):
+                flash("Image upload not supported yet.", "warning")
+                return redirect(request.url)
+        
+
+
+        if raw_vis in ("member-only", "member only", "member", "members", "private"):
+            visibility = "member"
+        elif raw_vis in ("public", "everyone", "all", "anyone", "public user"):
+            visibility = "public"
+        else:
+            visibility = raw_vis if raw_vis in ("public", "member") else "public"
+
+        if not title or not event_time or not location:
+            flash("Title, Date and Location are required.", "warning")
+            return render_template("Create.html")
+
+        starts_at = parse_event_time(event_time)
+        if starts_at is None:
+            flash("Please enter a valid date and time.", "warning")
+            return render_template("Create.html")
+
+        try:
+            price = float(price_raw) if price_raw else None
+        except ValueError:
+            flash("Price must be a number.", "warning")
+            return render_template("Create.html")
+
+        try:
+            capacity = int(capacity_raw) if capacity_raw else None
+        except ValueError:
+            capacity = 0
+        if capacity is not None and capacity < 1:
+            flash("Total tickets must be a whole number of at least 1.", "warning")
+            return render_template("Create.html")
+        
+    
+
+        # store the upload only once the form is valid, so failed submits leave no files
+        image_rel_path = store_event_image(file) if file and file.filename else None
+        image_variants = None
+        if image_rel_path:
+            sibling = Event.query.filter(Event.image == image_rel_path, Event.image_variants.isnot(None)).first()
+            image_variants = sibling.image_variants if sibling else None
+
+        evt = Event(title=title, 
+                    event_time=event_time, 
+                    starts_at=starts_at,
+                    location=location,
+                    price=price, 
+                    capacity=capacity,
+                    description=description or None,
+                    visibility=visibility,
+                    image=image_rel_path,
+                    image_variants=image_variants
+                    )
+        
+        db.session.add(evt)
+        db.session.commit()
+        if image_rel_path and not image_variants:
+            schedule_image_derivatives(evt.id)
+        flash("Event created.", "success")
+        return redirect(url_for("events.event_management"))
+    return render_template("Create.html")
+
+# -----------------------------
+# Event register (explicit endpoints)
+# -----------------------------
+@events_bp.route("/events/<int:event_id>/register", methods=["GET", "POST"], endpoint="register_event")
+def register_event(event_id: int):
+    ev = Event.query.get_or_404(event_id)
+    event = {
+        "id": ev.id,
+        "title": ev.title,
+        "date": ev.event_time,
+        "location": ev.location,
+        "price": f"${ev.price:.2f}" if ev.price is not None else "",
+    }
+    if request.method == "POST":
+        email = (request.form.get("email") or "").strip()
+        if not email:
+            flash("Email is required.", "warning")
+            return render_template("event_register.html", event=event)
+        session["last_event_email"] = email
+        return redirect(url_for("events.register_event_confirm", event_id=event_id))
+    return render_template("event_register.html", event=event)
+
+@events_bp.route("/events/<int:event_id>/register/confirm", endpoint="register_event_confirm")
+def register_event_confirm(event_id: int):
+    ev = Event.query.get_or_404(event_id)
+    event = {
+        "id": ev.id,
+        "title": ev.title,
+        "date": ev.event_time,
+        "location": ev.location,
+        "price": f"${ev.price:.2f}" if ev.price is not None else "",
+    }
+    email = session.pop("last_event_email", None)
+    status = None
+    if email:
+        status = register_for_event(ev.id, email)
+        if status:
+            queue_event_registration_email(email, ev, waitlisted=status == "waitlisted")
+        # commit either way: even an ignored INSERT holds the write lock until the transaction ends
+        db.session.commit()
+        if status:
+            current_app.logger.info(f"Queued event registration email ({status}) to {email} for event #{ev.id}")
+
+    return render_template("event_register_confirm.html", event=event, email=email, status=status)
+
+def _cancel_and_promote(ev, email):
+    """Cancel email's registration and queue the promoted registrant's email, in one commit."""
+    cancelled, promoted = cancel_registration(ev.id, email)
+    if promoted:
+        queue_seat_available_email(promoted, ev)
+    db.session.commit()
+    if promoted:
+        current_app.logger.info(f"Promoted {promoted} from the waitlist of event #{ev.id}")
+    return cancelled
+
+@events_bp.post("/events/<int:event_id>/cancel")
+@login_required
+def cancel_my_registration(event_id):
+    ev = Event.query.get_or_404(event_id)
+    if _cancel_and_promote(ev, session.get("user_email") or ""):
+        flash(f"Your registration for {ev.title} was cancelled.", "success")
+    else:
+        flash("You are not registered for this event.", "warning")
+    return redirect(url_for("events.Eventlist"))
+
+@events_bp.post("/events/<int:event_id>/registrations/cancel")
+@admin_required
+def cancel_event_registration(event_id):
+    ev = Event.query.get_or_404(event_id)
+    email = (request.form.get("email") or "").strip()
+    if email and _cancel_and_promote(ev, email):
+        flash(f"Cancelled the registration of {email}.", "success")
+    else:
+        flash(f"No registration for {email or 'that email'} on this event.", "warning")
+    return redirect(url_for("events.event_stats", event_id=ev.id))
+
+# Backward compatible alias (old links)
+@events_bp.route("/event_register/<int:event_id>", methods=["GET", "POST"])
+def register_event_legacy(event_id: int):
+    return register_event(event_id)
+
+@events_bp.route('/event/<int:event_id>')
+@read_only
+@conditional_event_page()
+def event_detail(event_id):
+    event = Event.query.get_or_404(event_id)
+    if event.visibility == "member" and not is_member_user():
+        flash("This event is for members only. Please log in.", "warning")
+        return redirect(url_for("auth.login"))
+    # registering and cancelling both update the event row, so the page's ETag follows this
+    email = session.get("user_email")
+    registered = bool(email) and db.session.query(Registration.id).filter(
+        Registration.event_id == event.id, func.lower(Registration.email) == email.lower()).first() is not None
+    return render_template('event_detail.html', event=event, ev=event, registered=registered)
@@ -0,0 +1,6 @@
+from flask_sqlalchemy import SQLAlchemy
+
+from db_backend import RoutingSession
+
+# Created unbound so models can be imported without an app; create_app() binds it
+db = SQLAlchemy(session_options={"class_": RoutingSession})
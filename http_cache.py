@@ -0,0 +1,48 @@
+import hashlib
+from datetime import datetime, timezone
+
+from flask import request
+
+
+# Cache-Control per route class. Public pages may be stored by proxies but must be
+# revalidated (they change when someone logs in); member pages carry the user's
+# name, so only the browser may keep them; admin pages are never stored.
+CACHE_POLICIES = {
+    "public": "public, no-cache",
+    "member": "private, no-cache",
+    "admin": "no-store",
+}
+
+
+def make_etag(*parts):
+    """Strong ETag value from the things a response depends on."""
+    return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def to_http_datetime(value):
+    """Normalise a naive-UTC datetime or a POSIX timestamp to a whole-second aware datetime."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        value = datetime.fromtimestamp(value, tz=timezone.utc)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def is_not_modified(etag, last_modified=None):
+    """True if the current request's validators match, so a 304 can be sent."""
+    if request.if_none_match:
+        # weak comparison (RFC 9110): compressed responses carry the ETag as W/"..."
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return to_http_datetime(last_modified) <= request.if_modified_since
+    return False
+
+
+def apply_validators(response, etag, last_modified=None, policy="public"):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = to_http_datetime(last_modified)
+    response.headers["Cache-Control"] = CACHE_POLICIES[policy]
+    return response
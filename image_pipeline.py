@@ -0,0 +1,42 @@
+import os
+
+try:  # Pillow is optional: without it events simply keep serving the original upload
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover
+    Image = None
+
+# Card images are shown at roughly 300-450 CSS px; 2x screens need the larger sizes
+DERIVATIVE_WIDTHS = (320, 640, 960)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def available():
+    return Image is not None
+
+
+def generate_derivatives(src_path, out_dir, stem, widths=DERIVATIVE_WIDTHS):
+    """Write resized WebP/JPEG copies of src_path into out_dir.
+
+    Returns {"webp": {"320": "<file name>", ...}, "jpeg": {...}}. Widths at or
+    above the original are skipped (only the smallest is always produced), so
+    small uploads are never upscaled.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    variants = {fmt: {} for fmt in DERIVATIVE_FORMATS}
+    with Image.open(src_path) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "transparency" in im.info else "RGB")
+        targets = [w for w in sorted(widths) if w < im.width] or [min(min(widths), im.width)]
+        for width in targets:
+            height = max(1, round(im.height * width / im.width))
+            resized = im.resize((width, height), Image.LANCZOS)
+            for fmt, (pil_format, options) in DERIVATIVE_FORMATS.items():
+                out = resized.convert("RGB") if pil_format == "JPEG" and resized.mode != "RGB" else resized
+                name = f"{stem}-{width}.{'jpg' if fmt == 'jpeg' else fmt}"
+                out.save(os.path.join(out_dir, name), pil_format, **options)
+                variants[fmt][str(width)] = name
+    return variants
@@ -0,0 +1,206 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from extensions import db
+from metrics import record_smtp, write_textfile
+from models import Event, OutboxEmail, Registration
+
+
+# -----------------------------
+# Email helpers (optional)
+# -----------------------------
+SMTP_HOST = os.environ.get("SMTP_HOST")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+SMTP_USER = os.environ.get("SMTP_USER")
+SMTP_PASS = os.environ.get("SMTP_PASS")
+FROM_EMAIL = os.environ.get("FROM_EMAIL", SMTP_USER or "no-reply@rgsq.org")
+
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") not in ("0", "false", "no")
+
+# Outbox retry policy: 30s, 1m, 2m, 4m, ... capped at an hour, then give up
+MAIL_MAX_ATTEMPTS = 8
+MAIL_RETRY_BASE_SECONDS = 30
+MAIL_RETRY_MAX_SECONDS = 3600
+# How long a worker may hold a claimed row before another worker retries it
+MAIL_CLAIM_SECONDS = 300
+
+def queue_email(to_email: str, subject: str, body: str) -> OutboxEmail:
+    """Add an email to the outbox. It is sent with the caller's commit, never in the request."""
+    row = OutboxEmail(to_email=to_email, subject=subject, body=body)
+    db.session.add(row)
+    return row
+
+def queue_welcome_email(to_email: str, level_name: str) -> OutboxEmail:
+    return queue_email(to_email, "Welcome to RGSQ", f"Welcome to RGSQ!\n\nMembership: {level_name}\n")
+
+def _event_details(ev: Event) -> list:
+    lines = [
+        f"Event: {ev.title}",
+        f"Time:  {ev.event_time}",
+        f"Place: {ev.location}",
+    ]
+    if ev.price is not None:
+        lines.append(f"Price: ${ev.price:.2f}")
+    if ev.description:
+        lines += ["", "Details:", ev.description]
+    return lines
+
+def queue_event_registration_email(to_email: str, ev: Event, waitlisted: bool = False) -> OutboxEmail:
+    if waitlisted:
+        subject = f"Event waitlist: {ev.title}"
+        intro = "The event is full, so you are on the waitlist. We will email you if a seat frees up."
+    else:
+        subject = f"Event registration confirmed: {ev.title}"
+        intro = "Thank you for registering!"
+    return queue_email(to_email, subject, "\n".join([intro, ""] + _event_details(ev)))
+
+def queue_seat_available_email(to_email: str, ev: Event) -> OutboxEmail:
+    """Tell a waitlisted registrant that a cancellation gave them a seat."""
+    intro = "A seat has freed up, so your place on the waitlist is now a confirmed registration."
+    return queue_email(to_email, f"You have a seat: {ev.title}", "\n".join([intro, ""] + _event_details(ev)))
+
+def build_email_message(row: OutboxEmail):
+    from email.message import EmailMessage
+    msg = EmailMessage()
+    msg["Subject"] = row.subject
+    msg["From"] = FROM_EMAIL
+    msg["To"] = row.to_email
+    msg.set_content(row.body)
+    return msg
+
+_smtp_pool = None
+
+def get_smtp_pool():
+    """Shared pool of authenticated SMTP sessions, created on first use."""
+    global _smtp_pool
+    if _smtp_pool is None:
+        from smtp_pool import SMTPPool  # smtplib/ssl are only loaded by processes that send mail
+        _smtp_pool = SMTPPool(SMTP_HOST, SMTP_PORT, user=SMTP_USER, password=SMTP_PASS,
+                              starttls=SMTP_STARTTLS, timeout=15)
+    return _smtp_pool
+
+def deliver_email(msg) -> None:
+    """Send one message over a pooled SMTP session; raises on failure so the outbox can retry."""
+    started = time.perf_counter()
+    try:
+        get_smtp_pool().send(msg)
+    finally:
+        record_smtp(time.perf_counter() - started)
+
+def mail_retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(MAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), MAIL_RETRY_MAX_SECONDS))
+
+def drain_outbox(batch_size: int = 20, now=None):
+    """Deliver due outbox rows once. Returns (sent, failed) counts for this pass."""
+    now = now or datetime.utcnow()
+    due = (OutboxEmail.query
+           .filter(OutboxEmail.status.in_(("pending", "sending")), OutboxEmail.next_attempt_at <= now)
+           .order_by(OutboxEmail.next_attempt_at.asc(), OutboxEmail.id.asc())
+           .limit(batch_size)
+           .all())
+    sent = failed = 0
+    for row in due:
+        unclaimed = (OutboxEmail.query
+                     .filter_by(id=row.id, status=row.status, next_attempt_at=row.next_attempt_at))
+        if row.attempts >= MAIL_MAX_ATTEMPTS:
+            # every attempt was claimed by a worker that died before finishing it
+            if unclaimed.update({"status": "failed"}, synchronize_session="fetch"):
+                print(f"[MAIL][ERROR] Giving up on email #{row.id} to {row.to_email} after {row.attempts} unfinished attempts")
+                failed += 1
+            db.session.commit()
+            continue
+        # claim the row so a second worker skips it; a crashed worker's claim expires.
+        # The attempt is counted now, so a message that crashes the worker still runs out.
+        claimed = unclaimed.update({"status": "sending", "attempts": OutboxEmail.attempts + 1,
+                                    "next_attempt_at": now + timedelta(seconds=MAIL_CLAIM_SECONDS)},
+                                   synchronize_session="fetch")
+        db.session.commit()
+        if not claimed:
+            continue
+        try:
+            deliver_email(build_email_message(row))
+        except Exception as e:
+            row.last_error = str(e)[:500]
+            if row.attempts >= MAIL_MAX_ATTEMPTS:
+                row.status = "failed"
+                print(f"[MAIL][ERROR] Giving up on email #{row.id} to {row.to_email}: {e}")
+            else:
+                row.status = "pending"
+                row.next_attempt_at = now + mail_retry_delay(row.attempts)
+                print(f"[MAIL] Email #{row.id} to {row.to_email} failed (attempt {row.attempts}), will retry: {e}")
+            failed += 1
+        else:
+            row.status = "sent"
+            row.sent_at = datetime.utcnow()
+            sent += 1
+            print(f"[MAIL] Sent email #{row.id} to {row.to_email}")
+        db.session.commit()
+    return sent, failed
+
+@click.command("mail-worker")
+@click.option("--once", is_flag=True, help="Drain the outbox once and exit.")
+@click.option("--interval", default=5.0, show_default=True, help="Seconds to sleep when the outbox is empty.")
+@with_appcontext
+def mail_worker(once, interval):
+    """Deliver queued emails from the outbox, retrying failures with backoff."""
+    if not SMTP_HOST:
+        print("[MAIL] SMTP not configured: missing SMTP_HOST, emails stay queued")
+        return
+    textfile = current_app.config["METRICS_TEXTFILE"]
+    try:
+        while True:
+            sent, failed = drain_outbox()
+            if textfile:
+                write_textfile(textfile)
+            if once:
+                break
+            if not (sent or failed):
+                time.sleep(interval)
+    finally:
+        get_smtp_pool().close()
+
+def notify_event_registrants(ev: Event, subject: str, body: str, chunk_size: int = 500) -> int:
+    """Queue one email per registrant of ev, reading registrations in id-ordered chunks.
+
+    Rows are bulk-inserted and committed per chunk, so memory stays flat however
+    large the event is; the mail worker then sends them over pooled sessions.
+    """
+    queued = 0
+    last_id = 0
+    while True:
+        chunk = (db.session.query(Registration.id, Registration.email)
+                 .filter(Registration.event_id == ev.id, Registration.id > last_id)
+                 .order_by(Registration.id.asc())
+                 .limit(chunk_size)
+                 .all())
+        if not chunk:
+            break
+        db.session.execute(
+            OutboxEmail.__table__.insert(),
+            [{"to_email": email, "subject": subject, "body": body,
+              "status": "pending", "attempts": 0, "next_attempt_at": datetime.utcnow(),
+              "created_at": datetime.utcnow()}
+             for _, email in chunk],
+        )
+        db.session.commit()
+        queued += len(chunk)
+        last_id = chunk[-1][0]
+    return queued
+
+@click.command("notify-registrants")
+@click.argument("event_id", type=int)
+@click.option("--subject", required=True, help="Email subject line.")
+@click.option("--message", required=True, help="Email body text.")
+@with_appcontext
+def notify_registrants_command(event_id, subject, message):
+    """Queue an announcement email to everyone registered for EVENT_ID."""
+    ev = db.session.get(Event, event_id)
+    if ev is None:
+        raise click.ClickException(f"No event #{event_id}")
+    queued = notify_event_registrants(ev, subject, message)
+    print(f"[MAIL] Queued {queued} email(s) for registrants of event #{ev.id}")
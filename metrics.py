@@ -0,0 +1,230 @@
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from flask import (Response, before_render_template, current_app, g, has_app_context, has_request_context,
+                   request, template_rendered)
+from sqlalchemy import event
+
+from auth_helpers import admin_required
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+request_log = logging.getLogger("rgsq.requests")
+smtp_log = logging.getLogger("rgsq.smtp")
+
+
+# -----------------------------
+# Prometheus histograms
+# -----------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """A Prometheus histogram with a fixed label set, rendered in the text exposition format."""
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1])) for k, v in self._series.items())
+        for label_values, (counts, total) in series:
+            pairs = [f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = ",".join(pairs + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {cumulative}")
+            base = "{" + ",".join(pairs) + "}" if pairs else ""
+            lines.append(f"{self.name}_sum{base} {total}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+        return "\n".join(lines)
+
+
+class AppMetrics:
+    """The histograms of one app, kept in this process.
+
+    Each worker process counts its own requests, so with several gunicorn
+    workers a scrape sees whichever worker answered it. SMTP sends happen in
+    the mail worker, which publishes its histogram through write_textfile.
+    """
+
+    def __init__(self):
+        self.request_seconds = Histogram(
+            "rgsq_request_duration_seconds", "Time from request start to response, by route.",
+            ("endpoint", "method", "status"))
+        self.template_seconds = Histogram(
+            "rgsq_request_template_seconds", "Time spent rendering templates per request.", ("endpoint",))
+        self.sql_queries = Histogram(
+            "rgsq_request_sql_queries", "SQL statements executed per request.", ("endpoint",),
+            buckets=QUERY_COUNT_BUCKETS)
+        self.sql_seconds = Histogram(
+            "rgsq_request_sql_seconds", "Time spent in SQL statements per request.", ("endpoint",))
+        self.smtp_seconds = Histogram(
+            "rgsq_smtp_send_seconds", "Time to hand one message to the SMTP server.")
+
+    def histograms(self):
+        return (self.request_seconds, self.template_seconds, self.sql_queries, self.sql_seconds)
+
+    def render(self, histograms=None):
+        return "\n".join(h.render() for h in histograms or self.histograms()) + "\n"
+
+
+class RequestStats:
+    """What the current request has spent so far; lives on g.request_metrics."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.template_started = None
+        self.template_seconds = 0.0
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+
+
+def get_metrics():
+    return current_app.extensions["metrics"]
+
+
+def _request_stats():
+    return g.get("request_metrics") if has_request_context() else None
+
+
+# -----------------------------
+# Collectors
+# -----------------------------
+def start_request():
+    g.request_metrics = RequestStats()
+
+def finish_request(response):
+    stats = _request_stats()
+    if stats is None:
+        return response
+    elapsed = time.perf_counter() - stats.started
+    endpoint = request.endpoint or "<unmatched>"
+    m = get_metrics()
+    m.request_seconds.observe(elapsed, endpoint, request.method, str(response.status_code))
+    m.template_seconds.observe(stats.template_seconds, endpoint)
+    m.sql_queries.observe(stats.sql_queries, endpoint)
+    m.sql_seconds.observe(stats.sql_seconds, endpoint)
+    if current_app.config["METRICS_LOG"]:
+        request_log.info(json.dumps({
+            "endpoint": endpoint, "method": request.method, "path": request.path,
+            "status": response.status_code, "duration_ms": round(elapsed * 1000, 2),
+            "template_ms": round(stats.template_seconds * 1000, 2), "sql_queries": stats.sql_queries,
+            "sql_ms": round(stats.sql_seconds * 1000, 2),
+        }))
+    return response
+
+def _template_started(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None:
+        stats.template_started = time.perf_counter()
+
+def _template_finished(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None and stats.template_started is not None:
+        stats.template_seconds += time.perf_counter() - stats.template_started
+        stats.template_started = None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_query_started"].pop()
+    stats = _request_stats()
+    if stats is not None:
+        stats.sql_queries += 1
+        stats.sql_seconds += time.perf_counter() - started
+
+def _handle_error(context):
+    # a failed statement never reaches after_cursor_execute
+    started = context.connection.info.get("metrics_query_started") if context.connection else None
+    if started:
+        started.pop()
+
+def instrument_engine(engine):
+    """Count statements and their time into the current request's stats."""
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+def record_smtp(seconds):
+    """Count one SMTP send (called by mail.deliver_email, so in the mail worker process)."""
+    if not has_app_context():
+        return
+    metrics = current_app.extensions.get("metrics")
+    if metrics is not None:
+        metrics.smtp_seconds.observe(seconds)
+    if current_app.config["METRICS_LOG"]:
+        smtp_log.info(json.dumps({"smtp_ms": round(seconds * 1000, 2)}))
+
+def write_textfile(path):
+    """Write the SMTP histogram to path for node_exporter's textfile collector.
+
+    Written to a temporary file and renamed over path, so a scrape never
+    reads half a file.
+    """
+    metrics = current_app.extensions.get("metrics")
+    if metrics is None:
+        return
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(metrics.render((metrics.smtp_seconds,)))
+    os.replace(tmp, path)
+
+
+def init_app(app):
+    if not app.config["METRICS_ENABLED"]:
+        return
+    app.extensions["metrics"] = AppMetrics()
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+
+# -----------------------------
+# /metrics
+# -----------------------------
+def metrics_access(view):
+    """Staff sessions, or a scraper sending `Authorization: Bearer <METRICS_TOKEN>`."""
+    staff_view = admin_required(view)
+
+    @wraps(view)
+    def wrapper(*a, **kw):
+        token = current_app.config["METRICS_TOKEN"]
+        auth = request.headers.get("Authorization", "")
+        if token and hmac.compare_digest(auth.encode(), f"Bearer {token}".encode()):
+            return view(*a, **kw)
+        return staff_view(*a, **kw)
+    return wrapper
+
+def metrics_response():
+    metrics = current_app.extensions.get("metrics")
+    if metrics is None:
+        return "Metrics are disabled.", 404
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8",
+                    headers={"Cache-Control": "no-store"})
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+
+# pg_advisory_xact_lock key serialising `flask db upgrade` across processes ("RGSQ")
+MIGRATION_LOCK_KEY = 0x52475351
+
+# Kept out of the models' metadata: db.create_all()/drop_all() must not touch it
+schema_meta = MetaData()
+schema_version = Table(
+    "schema_version", schema_meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class MigrationRegistry:
+    """Ordered schema migrations, each applied once and recorded in schema_version.
+
+    Migrations are functions taking a Connection, registered with increasing
+    version numbers. upgrade() runs the pending ones in a single transaction
+    while holding the database write lock, so concurrent callers (several
+    workers starting at once) apply each migration exactly once.
+    """
+
+    def __init__(self):
+        self.migrations = []  # [(version, name, fn)], ascending
+
+    def register(self, version, name=None):
+        def decorator(fn):
+            if self.migrations and version <= self.migrations[-1][0]:
+                raise ValueError(f"migration {version} registered after {self.migrations[-1][0]}")
+            self.migrations.append((version, name or fn.__name__, fn))
+            return fn
+        return decorator
+
+    @property
+    def head(self):
+        return self.migrations[-1][0] if self.migrations else 0
+
+    def current_version(self, conn):
+        """Applied version; 0 for an unversioned database, None if it has no tables at all."""
+        names = inspect(conn).get_table_names()
+        if "schema_version" not in names:
+            return 0 if names else None
+        return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+    def upgrade(self, engine, baseline=None, log=print):
+        """Apply pending migrations; returns the list of (version, name) applied.
+
+        baseline(conn), if given, builds the full current schema on an empty
+        database, which is then stamped at head without running migrations.
+        """
+        applied = []
+        with engine.begin() as conn:
+            if conn.dialect.name == "sqlite":
+                # take the write lock before looking at the schema; a second process
+                # waits here (busy timeout) and then finds nothing left to do
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            elif conn.dialect.name == "postgresql":
+                # DDL is transactional there; the lock is held until this transaction ends
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            schema_meta.create_all(conn)
+            names = inspect(conn).get_table_names()
+            fresh = names == ["schema_version"]
+            current = conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+            if fresh and baseline is not None:
+                baseline(conn)
+                self._stamp(conn, self.head, "baseline")
+                log(f"[MIGRATE] Created schema at version {self.head}")
+                return [(self.head, "baseline")]
+            for version, name, fn in self.migrations:
+                if version <= current:
+                    continue
+                log(f"[MIGRATE] {version}: {name}")
+                fn(conn)
+                self._stamp(conn, version, name)
+                applied.append((version, name))
+        return applied
+
+    @staticmethod
+    def _stamp(conn, version, name):
+        conn.execute(schema_version.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
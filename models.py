@@ -0,0 +1,385 @@
+import re
+from datetime import datetime, timezone
+
+from sqlalchemy import column, event as sa_event, func, table, text
+
+from db_backend import upsert_insert
+from extensions import db
+from passwords import hash_password, needs_rehash, verify_password
+
+
+# -----------------------------
+# Models
+# -----------------------------
+class Event(db.Model):
+    __tablename__ = "event"
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(100), nullable=False)
+    event_time = db.Column(db.String(50), nullable=False)  # ISO string or human-readable
+    starts_at = db.Column(db.DateTime, nullable=True, index=True)  # parsed event_time, used for ordering/range scans
+    location = db.Column(db.String(100), nullable=False)
+    price = db.Column(db.Float, nullable=True)
+    image = db.Column(db.String(200), nullable=True)
+    image_variants = db.Column(db.Text, nullable=True)  # JSON {"webp": {"320": "uploads/derived/..."}, "jpeg": {...}}
+    description = db.Column(db.Text, nullable=True)
+    visibility = db.Column(db.String(20), nullable=False, default="public")  # public/private
+    capacity = db.Column(db.Integer, nullable=True)  # None = unlimited
+    # registration counters kept in step by register_for_event/cancel_registration,
+    # so listings never count registration rows
+    seats_taken = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # confirmed
+    waitlist_size = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    registrations = db.relationship(
+        "Registration",
+        backref="event",
+        lazy="dynamic",
+        cascade="all, delete-orphan"
+    )
+
+    # listing queries filter on visibility and walk event time in order
+    __table_args__ = (
+        db.Index("ix_event_visibility_starts_at", "visibility", "starts_at"),
+    )
+
+class User(db.Model):
+    __tablename__ = "user"
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    full_name = db.Column(db.String(120))
+    password_hash = db.Column(db.String(200), nullable=False)
+    membership = db.Column(db.String(50))
+    # role fields retained for admin/member split
+    role = db.Column(db.String(20), nullable=False, default="member")
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+
+    def set_password(self, raw: str) -> None:
+        self.password_hash = hash_password(raw)
+
+    def check_password(self, raw: str) -> bool:
+        """Verify raw; on success, re-hash it if PASSWORD_HASH_METHOD changed (committed by the caller)."""
+        if not verify_password(self.password_hash, raw):
+            return False
+        if needs_rehash(self.password_hash):
+            self.set_password(raw)
+        return True
+    
+class Registration(db.Model):
+    __tablename__ = "registration"
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id"), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    registered_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), nullable=False, default="confirmed")  # confirmed/waitlisted
+
+    # one registration per event and address, whatever its capitalisation;
+    # the waitlist is read in id order per event
+    __table_args__ = (
+        db.Index("ux_registration_event_email", "event_id", func.lower(email), unique=True),
+        db.Index("ix_registration_event_status", "event_id", "status", "id"),
+    )
+
+def add_registration(event_id, email, status="confirmed"):
+    """Register email for an event in one statement; False if it already was (committed by the caller).
+
+    INSERT ... ON CONFLICT DO NOTHING against ux_registration_event_email, so
+    concurrent submits (double-clicks, retries) cannot both create a row.
+    """
+    reg = Registration.__table__
+    result = db.session.execute(
+        upsert_insert(db.session, reg)
+        .values(event_id=event_id, email=email, status=status, registered_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[reg.c.event_id, func.lower(reg.c.email)])
+    )
+    return result.rowcount == 1
+
+# -----------------------------
+# Seats and waitlist
+# -----------------------------
+# Seats are claimed with a conditional UPDATE of event.seats_taken, never by
+# counting registrations: the database applies it atomically (SQLite holds the
+# write lock, PostgreSQL re-checks the WHERE clause after waiting on the row
+# lock), so a burst of registrants cannot oversell an event.
+def claim_seat(event_id):
+    """Take one seat if the event has one free; True on success."""
+    ev = Event.__table__
+    result = db.session.execute(
+        ev.update()
+        .where(ev.c.id == event_id, (ev.c.capacity.is_(None)) | (ev.c.seats_taken < ev.c.capacity))
+        .values(seats_taken=ev.c.seats_taken + 1)
+    )
+    return result.rowcount == 1
+
+def release_seat(event_id):
+    ev = Event.__table__
+    db.session.execute(ev.update().where(ev.c.id == event_id, ev.c.seats_taken > 0)
+                       .values(seats_taken=ev.c.seats_taken - 1))
+
+def _change_waitlist_size(event_id, delta):
+    ev = Event.__table__
+    db.session.execute(ev.update().where(ev.c.id == event_id)
+                       .values(waitlist_size=ev.c.waitlist_size + delta))
+
+def register_for_event(event_id, email):
+    """Register email, confirmed if a seat is free and waitlisted otherwise (committed by the caller).
+
+    Returns "confirmed", "waitlisted", or None if email was already registered.
+    """
+    status = "confirmed" if claim_seat(event_id) else "waitlisted"
+    if add_registration(event_id, email, status=status):
+        if status == "waitlisted":
+            _change_waitlist_size(event_id, 1)
+        return status
+    if status == "confirmed":
+        release_seat(event_id)  # same transaction, so no one else saw the seat go
+    return None
+
+def cancel_registration(event_id, email):
+    """Remove a registration, handing its seat to the head of the waitlist (committed by the caller).
+
+    Returns (cancelled, promoted_email); promoted_email is None when nobody was waiting.
+    """
+    ev, reg = Event.__table__, Registration.__table__
+    # serialise cancellations per event before reading anything: a no-op UPDATE takes
+    # the event's row lock on PostgreSQL and the database write lock on SQLite, where
+    # SELECT ... FOR UPDATE is ignored and a plain read would take no lock at all
+    db.session.execute(ev.update().where(ev.c.id == event_id).values(seats_taken=ev.c.seats_taken))
+    row = db.session.execute(
+        db.select(reg.c.id, reg.c.status)
+        .where(reg.c.event_id == event_id, func.lower(reg.c.email) == email.lower())
+    ).first()
+    if row is None:
+        return False, None
+    if db.session.execute(reg.delete().where(reg.c.id == row.id)).rowcount == 0:
+        return False, None  # a concurrent cancel got there first
+    if row.status != "confirmed":
+        _change_waitlist_size(event_id, -1)
+        return True, None
+    waiting = db.session.execute(
+        db.select(reg.c.id, reg.c.email)
+        .where(reg.c.event_id == event_id, reg.c.status == "waitlisted")
+        .order_by(reg.c.id.asc()).limit(1)
+    ).first()
+    if waiting is None:
+        release_seat(event_id)
+        return True, None
+    db.session.execute(reg.update().where(reg.c.id == waiting.id).values(status="confirmed"))
+    _change_waitlist_size(event_id, -1)
+    return True, waiting.email
+
+# -----------------------------
+# Event full-text search (SQLite FTS5 / PostgreSQL tsvector)
+# -----------------------------
+# SQLite: external-content FTS5 index over event title/description/location. Triggers
+# keep it in sync with the event table, so Create/delete need no extra bookkeeping.
+EVENT_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS event_fts USING fts5(
+        title, description, location,
+        content='event', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    );
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS event_fts_ai AFTER INSERT ON event BEGIN
+        INSERT INTO event_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS event_fts_ad AFTER DELETE ON event BEGIN
+        INSERT INTO event_fts(event_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS event_fts_au AFTER UPDATE OF title, description, location ON event BEGIN
+        INSERT INTO event_fts(event_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO event_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END;
+    """,
+)
+
+# PostgreSQL: a GIN expression index; search_events must repeat EVENT_TSVECTOR
+# verbatim for the planner to use it. The index goes away with the table.
+EVENT_TSVECTOR = ("to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '') "
+                  "|| ' ' || coalesce(location, ''))")
+# ts_rank's default weights are A=1.0, B=0.4, D=0.1: the same 10/4/1 title/location/
+# description weighting as the bm25() call used on SQLite
+EVENT_TS_RANK = ("ts_rank(setweight(to_tsvector('simple', coalesce(event.title, '')), 'A') "
+                 "|| setweight(to_tsvector('simple', coalesce(event.location, '')), 'B') "
+                 "|| setweight(to_tsvector('simple', coalesce(event.description, '')), 'D'), "
+                 "to_tsquery('simple', :ts_q))")
+EVENT_SEARCH_DDL = {
+    "sqlite": EVENT_FTS_DDL,
+    "postgresql": (f"CREATE INDEX IF NOT EXISTS ix_event_search ON event USING gin ({EVENT_TSVECTOR});",),
+}
+
+# Not part of db.metadata (create_all must not build it as a plain table)
+event_fts = table("event_fts", column("rowid"))
+
+SEARCH_RESULT_LIMIT = 50
+
+def create_event_search_index(conn, rebuild=False):
+    for stmt in EVENT_SEARCH_DDL.get(conn.dialect.name, ()):
+        conn.exec_driver_sql(stmt)
+    if rebuild and conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("INSERT INTO event_fts(event_fts) VALUES ('rebuild');")
+
+@sa_event.listens_for(Event.__table__, "after_create")
+def _event_table_created(target, connection, **kw):
+    create_event_search_index(connection)
+
+@sa_event.listens_for(Event.__table__, "before_drop")
+def _event_table_dropping(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS event_fts;")
+
+def search_terms(raw):
+    return re.findall(r"\w+", raw or "")[:8]
+
+def fts_match_expression(raw):
+    """Turn user input into an FTS5 query: every word must match, as a prefix."""
+    return " ".join(f'"{t}"*' for t in search_terms(raw))
+
+def tsquery_expression(raw):
+    """The PostgreSQL to_tsquery() equivalent of fts_match_expression."""
+    return " & ".join(f"{t}:*" for t in search_terms(raw))
+
+def search_events(base_q, raw):
+    """Restrict an Event query to full-text matches for raw, best match first (None if no terms)."""
+    if not search_terms(raw):
+        return None
+    if db.session.get_bind().dialect.name == "postgresql":
+        return (base_q.filter(text(f"{EVENT_TSVECTOR} @@ to_tsquery('simple', :ts_q)"))
+                .params(ts_q=tsquery_expression(raw))
+                .order_by(text(f"{EVENT_TS_RANK} DESC"), Event.starts_at.asc(), Event.id.asc()))
+    match = fts_match_expression(raw)
+    return (base_q.join(event_fts, event_fts.c.rowid == Event.id)
+            .filter(text("event_fts MATCH :fts_q"))
+            .params(fts_q=match)
+            .order_by(text("bm25(event_fts, 10.0, 1.0, 4.0)"), Event.starts_at.asc(), Event.id.asc()))
+
+class StoredImage(db.Model):
+    """Uploaded file stored under its content hash; ref_count = events using it."""
+    __tablename__ = "stored_image"
+    sha256 = db.Column(db.String(64), primary_key=True)
+    path = db.Column(db.String(200), nullable=False, unique=True)  # relative to static/
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class OutboxEmail(db.Model):
+    """Email waiting to be delivered by the mail worker (see `flask mail-worker`)."""
+    __tablename__ = "email_outbox"
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending/sending/sent/failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    # the worker polls for due rows by status + time
+    __table_args__ = (
+        db.Index("ix_email_outbox_due", "status", "next_attempt_at"),
+    )
+
+class RateLimitBucket(db.Model):
+    """Attempts per key in one time bucket, for RATE_LIMIT_BACKEND = "database" (see rate_limit.py)."""
+    __tablename__ = "rate_limit"
+    key = db.Column(db.String(200), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)  # unix time // window
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class UserSession(db.Model):
+    """Server-side session data (see server_session.py); the cookie holds only the ID."""
+    __tablename__ = "user_session"
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of the cookie's session ID
+    user_id = db.Column(db.Integer, nullable=True, index=True)  # to revoke a user's sessions
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class DataVersion(db.Model):
+    """Change counter per data set, bumped by triggers; feeds HTTP ETags/Last-Modified."""
+    __tablename__ = "data_version"
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=True)  # UTC
+
+# Any write to the event table bumps data_version('events'), whichever process made it
+EVENT_VERSION_DDL = tuple(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS event_version_{op.lower()} AFTER {op} ON event BEGIN
+        INSERT INTO data_version(name, version, changed_at) VALUES ('events', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+    END;
+    """
+    for op in ("INSERT", "UPDATE", "DELETE")
+)
+
+# PostgreSQL triggers run a function; one bump per statement is enough for ETags
+EVENT_VERSION_PG_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION bump_events_data_version() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO data_version(name, version, changed_at) VALUES ('events', 1, timezone('utc', now()))
+        ON CONFLICT (name) DO UPDATE SET version = data_version.version + 1, changed_at = EXCLUDED.changed_at;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    "DROP TRIGGER IF EXISTS event_version ON event;",
+    """
+    CREATE TRIGGER event_version AFTER INSERT OR UPDATE OR DELETE ON event
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_events_data_version();
+    """,
+)
+
+def create_event_version_triggers(conn):
+    ddl = {"sqlite": EVENT_VERSION_DDL, "postgresql": EVENT_VERSION_PG_DDL}
+    for stmt in ddl.get(conn.dialect.name, ()):
+        conn.exec_driver_sql(stmt)
+
+@sa_event.listens_for(Event.__table__, "after_create")
+def _event_table_created_versioning(target, connection, **kw):
+    create_event_version_triggers(connection)
+
+
+# -----------------------------
+# Event time parsing
+# -----------------------------
+EVENT_TIME_FORMATS = (
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+)
+
+def parse_event_time(raw):
+    """Parse a free-form event_time string into a naive datetime (None if unparseable).
+
+    Times with an offset ("...T18:30+10:00", "...Z") are converted to UTC first,
+    so they order correctly against each other.
+    """
+    raw = (raw or "").strip()
+    if not raw:
+        return None
+    try:
+        parsed = datetime.fromisoformat(raw)
+    except ValueError:
+        parsed = None
+        for fmt in EVENT_TIME_FORMATS:
+            try:
+                parsed = datetime.strptime(raw, fmt)
+                break
+            except ValueError:
+                continue
+    if parsed is not None and parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
@@ -0,0 +1,119 @@
+from datetime import datetime
+from functools import wraps
+
+from flask import Response, current_app, g, make_response, render_template, request, session
+from markupsafe import escape
+
+from auth_helpers import get_current_user, user_display_name
+from compression import cache_compressed
+from extensions import db
+from http_cache import apply_validators, is_not_modified, make_etag
+from models import DataVersion
+from static_assets import asset_version
+
+
+# -----------------------------
+# HTTP caching (conditional GET)
+# -----------------------------
+def cache_policy():
+    return "member" if session.get("user_id") else "public"
+
+def conditional_event_page(extra=None):
+    """Answer If-None-Match/If-Modified-Since for pages built from the event table.
+
+    The ETag covers the events data version, the URL, the asset build the page links
+    to and who is asking (the navbar and member-only events differ per user), so a
+    304 skips the queries and Jinja.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*a, **kw):
+            if session.get("_flashes"):
+                return view(*a, **kw)
+            dv = db.session.get(DataVersion, "events")
+            version, changed_at = (dv.version, dv.changed_at) if dv else (0, None)
+            etag = make_etag(
+                request.full_path, version, extra() if extra else "", asset_version(),
+                session.get("user_id"), session.get("user_role"),
+                session.get("user_name"), session.get("user_email"),
+            )
+            policy = cache_policy()
+            if is_not_modified(etag, changed_at):
+                return apply_validators(Response(status=304), etag, changed_at, policy)
+            resp = make_response(view(*a, **kw))
+            if resp.status_code == 200:
+                apply_validators(resp, etag, changed_at, policy)
+            return resp
+        return wrapper
+    return decorator
+
+def upcoming_window():
+    # Home drops events once they start, so its ETag also rolls over every 10 minutes
+    return datetime.now().strftime("%Y-%m-%d %H:%M")[:-1]
+
+
+# -----------------------------
+# Static page render cache
+# -----------------------------
+# Content pages only vary by navbar: anonymous, member or admin. Each variant is
+# rendered once with placeholder tokens for the user's name/email, which are
+# swapped in per request, so a hit costs no Jinja work and no DB query.
+def get_page_cache():
+    """The current app's PageRenderCache (created by create_app)."""
+    return current_app.extensions["page_cache"]
+
+USER_NAME_TOKEN = "__rgsq_user_name__"
+USER_EMAIL_TOKEN = "__rgsq_user_email__"
+
+def navbar_variant():
+    if not session.get("user_id"):
+        return "anonymous"
+    role = session.get("user_role") if current_app.config["SESSION_USER_SNAPSHOT"] else None
+    if role is None:
+        u = get_current_user()
+        role = (u.role if u else None) or "member"
+    return "admin" if role.lower() in ("admin", "staff") else "member"
+
+def prerender_page(template_name, variant):
+    """Render template_name for a navbar variant without running context processors."""
+    fake_session = {}
+    name = None
+    if variant != "anonymous":
+        fake_session = {"user_id": True, "user_email": USER_EMAIL_TOKEN}
+        name = USER_NAME_TOKEN
+    return current_app.jinja_env.get_template(template_name).render(
+        config=current_app.config, request=request, g=g, session=fake_session,
+        current_user_name=name, is_admin=(variant == "admin"),
+    )
+
+def render_static_page(template_name):
+    # pending flash messages are shown on whatever page comes next, so skip the cache
+    if not current_app.config["RENDER_CACHE_ENABLED"] or session.get("_flashes"):
+        return render_template(template_name)
+    variant = navbar_variant()
+    name = email = None
+    if variant != "anonymous":
+        if current_app.config["SESSION_USER_SNAPSHOT"] and "user_name" in session:
+            name = session["user_name"]
+        else:
+            u = get_current_user()
+            name = user_display_name(u) if u else session.get("user_email") or "Account"
+        email = session.get("user_email") or ""
+
+    page_cache = get_page_cache()
+    mtime = page_cache.template_mtime(template_name)
+    assets = asset_version()
+    etag = make_etag(template_name, mtime, variant, name, email, assets)
+    policy = cache_policy()
+    if is_not_modified(etag, mtime):
+        return apply_validators(Response(status=304), etag, mtime, policy)
+
+    if variant == "anonymous":
+        # member ETags name the user, so keeping their max-level compressions would cost
+        # each user's first hit a slow compress and churn the shared compressed cache
+        cache_compressed(etag)
+    body = page_cache.get(template_name, (variant, assets), lambda: prerender_page(template_name, variant))
+    if variant != "anonymous":
+        body = (body.replace(USER_NAME_TOKEN.encode(), str(escape(name)).encode())
+                    .replace(USER_EMAIL_TOKEN.encode(), str(escape(email)).encode()))
+    return apply_validators(Response(body, mimetype="text/html"), etag, mtime, policy)
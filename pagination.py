@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_, tuple_
+
+
+def encode_cursor(sort_value, ident):
+    """Pack a (datetime-or-None, id) position into an opaque URL-safe token."""
+    payload = [sort_value.isoformat() if sort_value is not None else None, ident]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Reverse encode_cursor(); returns None for missing or tampered tokens."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        sort_raw, ident = json.loads(raw)
+        sort_value = datetime.fromisoformat(sort_raw) if sort_raw is not None else None
+        ident = int(ident)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    # ids are bound as 64-bit integers; anything wider fails in the driver
+    return (sort_value, ident) if -2**63 <= ident < 2**63 else None
+
+
+class KeysetPage:
+    """One page of a keyset (seek) paginated query, with cursors to its neighbours."""
+
+    def __init__(self, items, per_page, has_prev, has_next, sort_attr):
+        self.items = items
+        self.per_page = per_page
+        self.has_prev = has_prev and bool(items)
+        self.has_next = has_next and bool(items)
+        self.prev_cursor = encode_cursor(getattr(items[0], sort_attr), items[0].id) if self.has_prev else None
+        self.next_cursor = encode_cursor(getattr(items[-1], sort_attr), items[-1].id) if self.has_next else None
+
+
+def keyset_paginate(query, sort_col, id_col, per_page, after=None, before=None):
+    """Paginate query ordered by (sort_col, id_col) ascending, seeking past a cursor.
+
+    Costs one indexed range query per page however deep the cursor is, unlike
+    OFFSET/LIMIT plus COUNT(*). NULL sort values come first; the ORDER BY says
+    so explicitly, since PostgreSQL would otherwise put them last and the cursor
+    predicates below assume SQLite's order.
+    """
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+
+    if before_key is not None:
+        value, ident = before_key
+        if value is None:
+            cond = and_(sort_col.is_(None), id_col < ident)
+        else:
+            cond = or_(sort_col.is_(None), tuple_(sort_col, id_col) < tuple_(value, ident))
+        rows = (query.filter(cond)
+                .order_by(None)
+                .order_by(sort_col.desc().nulls_last(), id_col.desc())
+                .limit(per_page + 1)
+                .all())
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        return KeysetPage(items, per_page, has_prev=has_prev, has_next=True, sort_attr=sort_col.key)
+
+    if after_key is not None:
+        value, ident = after_key
+        if value is None:
+            cond = or_(and_(sort_col.is_(None), id_col > ident), sort_col.isnot(None))
+        else:
+            cond = tuple_(sort_col, id_col) > tuple_(value, ident)
+        query = query.filter(cond)
+
+    rows = (query.order_by(None)
+            .order_by(sort_col.asc().nulls_first(), id_col.asc())
+            .limit(per_page + 1)
+            .all())
+    has_next = len(rows) > per_page
+    return KeysetPage(rows[:per_page], per_page, has_prev=after_key is not None, has_next=has_next,
+                      sort_attr=sort_col.key)
@@ -0,0 +1,103 @@
+import threading
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# PASSWORD_HASH_METHOD values: Werkzeug methods spelled as Werkzeug stores them
+# ("pbkdf2:sha256:600000", "scrypt:32768:8:1") or "bcrypt:<rounds>"
+DEFAULT_PASSWORD_HASH_METHOD = "pbkdf2:sha256:600000"
+
+
+class PasswordHasherBusy(Exception):
+    """No hashing slot came free within PASSWORD_HASH_QUEUE_TIMEOUT seconds."""
+
+
+# -----------------------------
+# Hash functions (run in the pool processes)
+# -----------------------------
+def _hash(raw, method):
+    if method.startswith("bcrypt"):
+        import bcrypt
+        rounds = int(method.partition(":")[2] or 12)
+        return bcrypt.hashpw(raw.encode("utf-8"), bcrypt.gensalt(rounds)).decode("ascii")
+    return generate_password_hash(raw, method=method)
+
+def _verify(stored, raw):
+    if stored.startswith("$2"):
+        import bcrypt
+        return bcrypt.checkpw(raw.encode("utf-8"), stored.encode("ascii"))
+    return check_password_hash(stored, raw)
+
+def hash_method_of(stored):
+    """The PASSWORD_HASH_METHOD that produced a stored hash."""
+    if stored.startswith("$2"):
+        return f"bcrypt:{int(stored.split('$')[2])}"
+    return stored.split("$", 1)[0]
+
+
+# -----------------------------
+# Worker pool
+# -----------------------------
+# Key stretching is deliberately CPU-bound, so a login burst would otherwise pin
+# every request thread. Hashes run in a small process pool instead; the
+# semaphore bounds how many may wait for it, and requests beyond that get a 503
+# rather than queueing without limit. The pool is started on first use, so a
+# preloading master never forks with it running, and started again if one of
+# its processes dies (OOM kill, segfault), which breaks the whole pool.
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # spawn, not fork: forking a process with live request threads can deadlock
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _drop_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:  # another request may already have replaced it
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _run(fn, *args):
+    global _slots
+    from concurrent.futures.process import BrokenProcessPool
+
+    cfg = current_app.config
+    workers = cfg["PASSWORD_HASH_WORKERS"]
+    if not workers:
+        return fn(*args)
+    with _pool_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(workers * (1 + cfg["PASSWORD_HASH_QUEUE"]))
+    if not _slots.acquire(timeout=cfg["PASSWORD_HASH_QUEUE_TIMEOUT"]):
+        raise PasswordHasherBusy()
+    try:
+        for attempt in range(2):
+            pool = _get_pool(workers)
+            try:
+                return pool.submit(fn, *args).result()
+            except BrokenProcessPool:
+                print(f"[PASSWORDS][ERROR] Hashing pool broke, starting a new one (attempt {attempt + 1})")
+                _drop_pool(pool)
+        raise PasswordHasherBusy()
+    finally:
+        _slots.release()
+
+def hash_password(raw):
+    return _run(_hash, raw, current_app.config["PASSWORD_HASH_METHOD"])
+
+def verify_password(stored, raw):
+    return bool(stored) and _run(_verify, stored, raw or "")
+
+def needs_rehash(stored):
+    return hash_method_of(stored) != current_app.config["PASSWORD_HASH_METHOD"]
+
+def hasher_busy(e):
+    return "Too many sign-ins at once, please try again in a moment.", 503, {"Retry-After": "2"}
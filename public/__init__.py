@@ -0,0 +1,11 @@
+from flask import Blueprint
+
+# cli_group=None keeps `flask export-pages` a top-level command
+public_bp = Blueprint(
+    "public",
+    __name__,
+    template_folder="../templates",
+    cli_group=None
+)
+
+from . import views  # noqa
@@ -0,0 +1,172 @@
+from . import public_bp
+import os
+from datetime import datetime
+import click
+from flask import current_app, render_template, request, url_for
+from auth_helpers import is_member_user
+from db_backend import read_only
+from models import Event
+from pages import conditional_event_page, render_static_page, upcoming_window
+
+# -----------------------------
+# Home
+# -----------------------------
+@public_bp.route("/")
+@read_only
+@conditional_event_page(extra=upcoming_window)
+def Home():
+    base_q = Event.query.filter(Event.starts_at >= datetime.now())
+    if not is_member_user():
+        base_q = base_q.filter(Event.visibility == "public")
+    events = base_q.order_by(Event.starts_at.asc(), Event.id.asc()).limit(4).all()
+    return render_template("homepage.html", events=events, upcoming_events=events)
+
+# -----------------------------
+# Static content pages (restored for navbar links)
+# -----------------------------
+@public_bp.route("/Memberbenefits.html")
+def Memberbenefits():
+    return render_static_page("Memberbenefits.html")
+
+@public_bp.route("/JoinRGSQ.html", endpoint="join_rgsq")
+def JoinRGSQ():
+    return render_static_page("JoinRGSQ.html")
+
+@public_bp.route("/join", methods=["GET"])
+def join_page():
+    membership = request.args.get("membership")
+    return render_template("JoinRGSQ.html", membership=membership)
+
+@public_bp.route("/Aboutsociety.html")
+def Aboutsociety():
+    return render_static_page("Aboutsociety.html")
+
+@public_bp.route("/Contact.html")
+def contact():
+    return render_static_page("Contact.html")
+
+@public_bp.route("/Forgotpassword.html")
+def forgot_password():
+    return render_static_page("Forgotpassword.html")
+
+@public_bp.route("/Library.html")
+def library():
+    return render_static_page("Library.html")
+
+@public_bp.route("/Venuehire.html")
+def venue_hire():
+    return render_static_page("Venuehire.html")
+
+@public_bp.route("/Bulletin.html")
+def bulletin():
+    return render_static_page("Bulletin.html")
+
+@public_bp.route("/Geographywebsite.html")
+def geography_website():
+    return render_static_page("Geographywebsite.html")
+
+# route with spaces kept to match template filename
+@public_bp.route("/Museums and other attractions.html")
+def Museums_and_other_attractions():
+    return render_static_page("Museums and other attractions.html")
+
+@public_bp.route("/MapResources.html")
+def MapResources():
+    return render_static_page("MapResources.html")
+
+@public_bp.route("/PhilateliesCover.html")
+def PhilateliesCover():
+    return render_static_page("PhilateliesCover.html")
+
+@public_bp.route("/Disclaimer.html")
+def Disclaimer():
+    return render_static_page("Disclaimer.html")
+
+@public_bp.route("/Committees.html")
+def committees_html():
+    return render_static_page("Committees.html")
+
+@public_bp.route("/Governance.html")
+def governance_html():
+    return render_static_page("Governance.html")
+
+@public_bp.route("/Honoursboard.html")
+def honours_board():
+    return render_static_page("Honoursboard.html")
+
+@public_bp.route("/Donate.html")
+def donate():
+    return render_static_page("Donate.html")
+
+@public_bp.route("/AustraliaGeographyCompetitions.html")
+def australia_geography_competitions():
+    return render_static_page("AustraliaGeographyCompetitions.html")
+
+@public_bp.route("/Lambertcenter.html")
+def lambert_center():
+    return render_static_page("Lambertcenter.html")
+
+@public_bp.route("/Queenslandbydegrees.html")
+def queensland_by_degrees():
+    return render_static_page("Queenslandbydegrees.html")
+
+# Society / News (list + details)
+@public_bp.route("/SocietyNews.html")
+def SocietyNews():
+    return render_static_page("SocietyNews.html")
+
+@public_bp.route("/SocietyNews_2025_writing_comp.html")
+def SocietyNews_2025_writing_comp():
+    return render_static_page("SocietyNews_2025_writing_comp.html")
+
+@public_bp.route("/SocietyNews_2025_tsunami_boulder.html")
+def SocietyNews_2025_tsunami_boulder():
+    return render_static_page("SocietyNews_2025_tsunami_boulder.html")
+
+@public_bp.route("/SocietyNews_2024_gbwo.html")
+def SocietyNews_2024_gbwo():
+    return render_static_page("SocietyNews_2024_gbwo.html")
+
+@public_bp.route("/SocietyNews_2024_souvenir_exhibition.html")
+def SocietyNews_2024_souvenir_exhibition():
+    return render_static_page("SocietyNews_2024_souvenir_exhibition.html")
+
+# Awards & Grants
+@public_bp.route("/AwardsPrizes.html")
+def AwardsPrizes():
+    return render_static_page("AwardsPrizes.html")
+
+@public_bp.route("/StudentResearchGrants.html")
+def StudentResearchGrants():
+    return render_static_page("StudentResearchGrants.html")
+
+# Public content pages written out by `flask export-pages` for a front proxy
+STATIC_PAGE_ENDPOINTS = (
+    "Memberbenefits", "join_rgsq", "Aboutsociety", "contact", "forgot_password", "library",
+    "venue_hire", "bulletin", "geography_website", "Museums_and_other_attractions",
+    "MapResources", "PhilateliesCover", "Disclaimer", "committees_html", "governance_html",
+    "honours_board", "donate", "australia_geography_competitions", "lambert_center",
+    "queensland_by_degrees", "SocietyNews", "SocietyNews_2025_writing_comp",
+    "SocietyNews_2025_tsunami_boulder", "SocietyNews_2024_gbwo",
+    "SocietyNews_2024_souvenir_exhibition", "AwardsPrizes", "StudentResearchGrants",
+)
+
+@public_bp.cli.command("export-pages")
+@click.argument("out_dir", type=click.Path(file_okay=False))
+def export_pages(out_dir):
+    """Write the anonymous variant of every public content page to OUT_DIR."""
+    from urllib.parse import unquote
+    os.makedirs(out_dir, exist_ok=True)
+    app = current_app._get_current_object()
+    client = app.test_client()
+    for endpoint in STATIC_PAGE_ENDPOINTS:
+        with app.test_request_context():
+            path = url_for(f"public.{endpoint}")
+        res = client.get(path)
+        if res.status_code != 200:
+            print(f"[EXPORT] Skipping {path}: HTTP {res.status_code}")
+            continue
+        target = os.path.join(out_dir, unquote(path.lstrip("/")))
+        with open(target, "wb") as f:
+            f.write(res.data)
+        print(f"[EXPORT] {path} -> {target}")
@@ -0,0 +1,158 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+
+from db_backend import UPSERT_INSERTS
+from extensions import db
+from models import RateLimitBucket
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+# -----------------------------
+# Sliding-window counters
+# -----------------------------
+# Each key counts hits in fixed buckets of `window` seconds; the estimate for the
+# last `window` seconds is the current bucket plus the previous one weighted by
+# how much of it still overlaps. Two integers per key, and no burst of 2x the
+# limit across a bucket boundary as with plain fixed windows.
+def sliding_count(prev, curr, now, window):
+    overlap = 1 - (now % window) / window
+    return prev * overlap + curr
+
+def seconds_until_allowed(prev, curr, now, window, limit):
+    """How long until sliding_count drops back to limit, if no more attempts come in."""
+    into = now % window
+    if curr <= limit:
+        # within this bucket, as the previous one slides out
+        return max(1, math.ceil((1 - (limit - curr) / prev) * window - into))
+    # in the next bucket, once enough of this one has slid out
+    return max(1, math.ceil(window - into + (1 - limit / curr) * window))
+
+
+class MemoryBackend:
+    """Counters in this process only; each worker process limits on its own.
+
+    At most MAX_KEYS keys are kept, least recently hit evicted first, so a
+    stuffing run with endless distinct emails costs O(1) per hit and bounded
+    memory (the per-IP key keeps being hit, so it is not the one evicted).
+    """
+
+    MAX_KEYS = 100_000
+
+    def __init__(self):
+        self._counts = OrderedDict()  # key -> (bucket, prev_count, curr_count), oldest hit first
+        self._lock = threading.Lock()
+
+    def incr(self, key, bucket):
+        """Count a hit in bucket; returns (previous bucket's count, this bucket's count)."""
+        with self._lock:
+            b, prev, curr = self._counts.pop(key, (bucket, 0, 0))
+            if b != bucket:
+                prev, curr = (curr if b == bucket - 1 else 0), 0
+            curr += 1
+            self._counts[key] = (bucket, prev, curr)
+            if len(self._counts) > self.MAX_KEYS:
+                self._counts.popitem(last=False)
+            return prev, curr
+
+    def sweep(self, windows, now):
+        """Nothing to do: MAX_KEYS already bounds the counters."""
+        return 0
+
+
+class DatabaseBackend:
+    """Counters in the rate_limit table, shared by every worker using the database."""
+
+    def incr(self, key, bucket):
+        t = RateLimitBucket.__table__
+        # own transaction: the hit must count even if the request fails later
+        with db.engine.begin() as conn:
+            conn.execute(UPSERT_INSERTS[conn.dialect.name](t).values(key=key, bucket=bucket, count=1)
+                         .on_conflict_do_update(index_elements=["key", "bucket"],
+                                                set_={"count": t.c.count + 1}))
+            rows = dict(conn.execute(db.select(t.c.bucket, t.c.count)
+                                     .where(t.c.key == key, t.c.bucket >= bucket - 1)).all())
+            conn.execute(t.delete().where(t.c.key == key, t.c.bucket < bucket - 1))
+        return rows.get(bucket - 1, 0), rows.get(bucket, 0)
+
+    def sweep(self, windows, now):
+        """Delete every key's buckets that no longer count; returns the number of rows removed.
+
+        incr only tidies the key it hits, so keys that are never hit again (a
+        stuffing run's endless distinct emails) would otherwise stay forever.
+        """
+        t = RateLimitBucket.__table__
+        deleted = 0
+        with db.engine.begin() as conn:
+            for window in windows:
+                deleted += conn.execute(t.delete().where(t.c.key.startswith(f"{window}:", autoescape=True),
+                                                         t.c.bucket < int(now // window) - 1)).rowcount
+        return deleted
+
+
+RATE_LIMIT_BACKENDS = {"memory": MemoryBackend, "database": DatabaseBackend}
+
+
+class RateLimiter:
+    SWEEP_SECONDS = 60  # how often a limiter clears out expired buckets
+
+    def __init__(self, app):
+        self.backend = RATE_LIMIT_BACKENDS[app.config["RATE_LIMIT_BACKEND"]]()
+        self.windows = set()
+        self._next_sweep = 0.0
+
+    def hit(self, key, limit, window, now=None):
+        """Count an attempt for key; returns 0 if it is within limit, else seconds to wait."""
+        now = time.time() if now is None else now
+        bucket = int(now // window)
+        prev, curr = self.backend.incr(f"{window}:{key}", bucket)
+        self.windows.add(window)
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.SWEEP_SECONDS
+            self.backend.sweep(tuple(self.windows), now)
+        if sliding_count(prev, curr, now, window) <= limit:
+            return 0
+        return seconds_until_allowed(prev, curr, now, window, limit)
+
+
+def get_rate_limiter():
+    return current_app.extensions["rate_limiter"]
+
+
+def rate_limited(scope):
+    """Limit POSTs to a view per client IP and per submitted email, as set in RATE_LIMITS[scope].
+
+    Runs before the view, so refused attempts cost no password hashing. Behind
+    a reverse proxy the client IP is only right with PROXY_FIX_X_FOR set.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*a, **kw):
+            if request.method == "POST" and current_app.config["RATE_LIMIT_ENABLED"]:
+                limiter = get_rate_limiter()
+                email = (request.form.get("email") or "").strip().lower()
+                # the email is unvalidated form input: count it by digest, so keys stay short
+                values = {"ip": (request.remote_addr or "-")[:64],
+                          "email": hashlib.sha256(email.encode("utf-8")).hexdigest() if email else ""}
+                for kind, (limit, window) in current_app.config["RATE_LIMITS"][scope].items():
+                    if values[kind]:
+                        wait = limiter.hit(f"{scope}:{kind}:{values[kind]}", limit, window)
+                        if wait:
+                            raise RateLimited(wait)
+            return view(*a, **kw)
+        return wrapper
+    return decorator
+
+
+def too_many_attempts(e):
+    return "Too many attempts, please wait a little and try again.", 429, {"Retry-After": str(e.retry_after)}
@@ -0,0 +1,47 @@
+import os
+import threading
+
+
+class PageRenderCache:
+    """Rendered HTML for data-free pages, kept per (template, navbar variant).
+
+    Entries remember the template file's mtime and are re-rendered when the
+    file changes on disk, so editing a template never serves stale bytes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._entries = {}  # (template, variant) -> (mtime, bytes)
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def _template_path(self, template_name):
+        path = self._paths.get(template_name)
+        if path is None:
+            env = self.app.jinja_env
+            _, path, _ = env.loader.get_source(env, template_name)
+            self._paths[template_name] = path
+        return path
+
+    def template_mtime(self, template_name):
+        try:
+            return os.path.getmtime(self._template_path(template_name))
+        except (OSError, TypeError):
+            return None
+
+    def get(self, template_name, variant, render):
+        """Return cached bytes for the key, calling render() on a miss or a changed template."""
+        key = (template_name, variant)
+        mtime = self.template_mtime(template_name)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+        body = render().encode("utf-8")
+        with self._lock:
+            self._entries[key] = (mtime, body)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._paths.clear()
@@ -0,0 +1,217 @@
+import json
+import os
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import DateTime, Integer, String, Text, inspect
+from sqlalchemy.schema import CreateIndex
+
+from extensions import db
+from migrations import MigrationRegistry
+from models import (Event, RateLimitBucket, Registration, UserSession, create_event_search_index,
+                    create_event_version_triggers, parse_event_time)
+
+
+# -----------------------------
+# Schema migrations
+# -----------------------------
+# Applied once by `flask db upgrade` and recorded in schema_version; at start-up
+# the app only compares the stored version with migrations.head. Append new
+# migrations with the next number, never renumber or edit applied ones.
+migrations = MigrationRegistry()
+
+def column_names(conn, table_name):
+    return {c["name"] for c in inspect(conn).get_columns(table_name)}
+
+def add_column(conn, table_name, name, type_, default=None, nullable=True):
+    """ALTER TABLE ... ADD COLUMN, quoted and typed for conn's dialect ("user" is reserved on PostgreSQL)."""
+    quote = conn.dialect.identifier_preparer.quote
+    ddl = f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(name)} {type_.compile(dialect=conn.dialect)}"
+    if default is not None:
+        ddl += f" DEFAULT {default}"
+    if not nullable:
+        ddl += " NOT NULL"
+    conn.exec_driver_sql(ddl)
+
+@migrations.register(1)
+def create_missing_tables(conn):
+    db.metadata.create_all(conn)
+
+@migrations.register(2)
+def migrate_event_table(conn):
+    names = column_names(conn, "event")
+    if "event_time" not in names:
+        add_column(conn, "event", "event_time", Text())
+        if "date" in names:
+            conn.exec_driver_sql("UPDATE event SET event_time = date;")
+
+@migrations.register(3)
+def migrate_user_table(conn):
+    names = column_names(conn, "user")
+    if "role" not in names:
+        add_column(conn, "user", "role", Text(), default="'member'")
+    if "is_active" not in names:
+        add_column(conn, "user", "is_active", Integer(), default="1")
+
+@migrations.register(4)
+def migrate_event_visibility(conn):
+    if "visibility" not in column_names(conn, "event"):
+        add_column(conn, "event", "visibility", Text(), default="'public'")
+
+@migrations.register(5)
+def migrate_event_starts_at(conn):
+    """Add event.starts_at, backfill it from event_time and create the listing indexes."""
+    event_t = Event.__table__
+    if "starts_at" not in column_names(conn, "event"):
+        add_column(conn, "event", "starts_at", DateTime())
+    rows = conn.exec_driver_sql(
+        "SELECT id, event_time FROM event WHERE starts_at IS NULL AND event_time IS NOT NULL;"
+    ).fetchall()
+    for ev_id, raw in rows:
+        parsed = parse_event_time(raw)
+        if parsed is None:
+            print(f"[MIGRATE] event #{ev_id}: could not parse event_time {raw!r}, leaving starts_at empty")
+            continue
+        conn.execute(event_t.update().where(event_t.c.id == ev_id).values(starts_at=parsed))
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_event_starts_at ON event (starts_at);")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_event_visibility_starts_at ON event (visibility, starts_at);"
+    )
+
+@migrations.register(6)
+def migrate_event_image_variants(conn):
+    if "image_variants" not in column_names(conn, "event"):
+        add_column(conn, "event", "image_variants", Text())
+
+@migrations.register(7)
+def migrate_event_search(conn):
+    # the FTS5 content has to be rebuilt from existing events the first time only
+    create_event_search_index(conn, rebuild=not inspect(conn).has_table("event_fts"))
+
+@migrations.register(8)
+def migrate_data_version(conn):
+    create_event_version_triggers(conn)
+
+@migrations.register(9)
+def migrate_registration_table(conn):
+    Registration.__table__.create(conn, checkfirst=True)
+
+@migrations.register(10)
+def migrate_registration_unique_email(conn):
+    """Drop duplicate registrations (keeping the first) and add ux_registration_event_email."""
+    deleted = conn.exec_driver_sql(
+        "DELETE FROM registration WHERE id NOT IN "
+        "(SELECT MIN(id) FROM registration GROUP BY event_id, lower(email));"
+    ).rowcount
+    if deleted:
+        print(f"[MIGRATE] removed {deleted} duplicate registration(s)")
+    # IF NOT EXISTS rather than checkfirst: reflection skips expression indexes
+    for index in Registration.__table__.indexes:
+        if index.name == "ux_registration_event_email":
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+@migrations.register(11)
+def migrate_event_capacity(conn):
+    """Add event.capacity/seats_taken and registration.status; existing registrations hold seats."""
+    names = column_names(conn, "event")
+    if "capacity" not in names:
+        add_column(conn, "event", "capacity", Integer())
+    if "seats_taken" not in names:
+        add_column(conn, "event", "seats_taken", Integer(), default="0", nullable=False)
+    if "status" not in column_names(conn, "registration"):
+        add_column(conn, "registration", "status", String(20), default="'confirmed'", nullable=False)
+    conn.exec_driver_sql(
+        "UPDATE event SET seats_taken = (SELECT COUNT(*) FROM registration "
+        "WHERE registration.event_id = event.id AND registration.status = 'confirmed');"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_registration_event_status ON registration (event_id, status, id);"
+    )
+
+@migrations.register(12)
+def migrate_event_waitlist_size(conn):
+    if "waitlist_size" not in column_names(conn, "event"):
+        add_column(conn, "event", "waitlist_size", Integer(), default="0", nullable=False)
+    conn.exec_driver_sql(
+        "UPDATE event SET waitlist_size = (SELECT COUNT(*) FROM registration "
+        "WHERE registration.event_id = event.id AND registration.status = 'waitlisted');"
+    )
+
+@migrations.register(13)
+def migrate_rate_limit_table(conn):
+    RateLimitBucket.__table__.create(conn, checkfirst=True)
+
+@migrations.register(14)
+def migrate_user_session_table(conn):
+    UserSession.__table__.create(conn, checkfirst=True)
+
+def upgrade_database():
+    # an empty database gets the current models (plus FTS/trigger listeners) directly
+    return migrations.upgrade(db.engine, baseline=db.metadata.create_all)
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is behind the migrations this code was written against."""
+
+def _refuse_requests():
+    return "The database schema is out of date; run `flask db upgrade`.", 503
+
+def check_schema_version():
+    """Start-up check: one query against schema_version, no DDL.
+
+    A database behind head raises SchemaOutOfDate, so a worker never starts
+    serving from tables its models do not match. Under the flask CLI the app
+    must still load for `flask db upgrade` to run, so there it only warns and
+    every request is answered with a 503.
+    """
+    with db.engine.connect() as conn:
+        current = migrations.current_version(conn)
+    if current == migrations.head:
+        return True
+    if current_app.config["MIGRATE_ON_START"]:
+        upgrade_database()
+        return True
+    message = (f"Database schema is at version {current or 0}, this code expects "
+               f"{migrations.head}; run `flask db upgrade` (or set MIGRATE_ON_START=1)")
+    if click.get_current_context(silent=True) is None:
+        raise SchemaOutOfDate(message)
+    print(f"[MIGRATE] {message}")
+    current_app.before_request(_refuse_requests)
+    return False
+
+db_cli = AppGroup("db", help="Database schema commands.")
+
+@db_cli.command("upgrade")
+def db_upgrade_command():
+    """Apply pending schema migrations."""
+    applied = upgrade_database()
+    if not applied:
+        print(f"[MIGRATE] Already at version {migrations.head}")
+
+@db_cli.command("current")
+def db_current_command():
+    """Show the applied schema version."""
+    with db.engine.connect() as conn:
+        current = migrations.current_version(conn)
+    print(f"[MIGRATE] Database at version {current or 0}, head is {migrations.head}")
+
+SEED_EVENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed_events.json")
+
+def seed_events(path=SEED_EVENTS_FILE):
+    """Add the sample events in path to an empty event table; returns how many were added."""
+    if db.session.query(Event.id).first() is not None:
+        return 0
+    with open(path, encoding="utf-8") as f:
+        rows = json.load(f)
+    db.session.add_all(Event(starts_at=parse_event_time(row["event_time"]), **row) for row in rows)
+    db.session.commit()
+    return len(rows)
+
+@db_cli.command("seed")
+def db_seed_command():
+    """Load the sample events into an empty database (local development)."""
+    added = seed_events()
+    if added:
+        print(f"[MIGRATE] Added {added} sample event(s)")
+    else:
+        print("[MIGRATE] The event table is not empty, nothing seeded")
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import secrets
+from datetime import datetime
+
+import click
+from flask import current_app, session
+from flask.cli import AppGroup
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+
+from db_backend import UPSERT_INSERTS
+from extensions import db
+from models import User, UserSession
+
+# Session data is serialised like Flask's cookie sessions (tuples, Markup, dates
+# survive), but kept server-side; the cookie only carries a random session ID.
+_serializer = TaggedJSONSerializer()
+
+
+def _session_key(sid):
+    # stores hold a hash of the ID, so a leaked table or directory cannot be replayed as cookies
+    return hashlib.sha256(sid.encode("ascii")).hexdigest()
+
+
+class ServerSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.rotated_from = None
+
+    def rotate(self):
+        """Move the data to a fresh ID (call on login, against session fixation)."""
+        if self.sid:
+            self.rotated_from = self.rotated_from or self.sid
+        self.sid = None
+        self.modified = True
+
+
+def rotate_session():
+    """rotate() the current session when it is server-side; a no-op for cookie sessions."""
+    if isinstance(session, ServerSession):
+        session.rotate()
+
+
+# -----------------------------
+# Stores
+# -----------------------------
+class DatabaseSessionStore:
+    """Sessions in the user_session table; each call runs in its own short transaction."""
+
+    @staticmethod
+    def _release_request_connection():
+        # Saving happens after the view, while db.session may still hold a pooled
+        # connection; with every request waiting for a second one the pool would
+        # run dry. Whatever the view left uncommitted is rolled back at teardown
+        # anyway, so end that transaction now and reuse its connection.
+        db.session.rollback()
+
+    def load(self, key, now):
+        with db.engine.connect() as conn:
+            data = conn.execute(db.select(UserSession.data)
+                                .where(UserSession.key == key, UserSession.expires_at > now)).scalar()
+        return data
+
+    def save(self, key, data, user_id, expires_at):
+        t = UserSession.__table__
+        values = {"data": data, "user_id": user_id, "expires_at": expires_at}
+        self._release_request_connection()
+        with db.engine.begin() as conn:
+            conn.execute(UPSERT_INSERTS[conn.dialect.name](t).values(key=key, **values)
+                         .on_conflict_do_update(index_elements=["key"], set_=values))
+
+    def delete(self, key):
+        self._release_request_connection()
+        with db.engine.begin() as conn:
+            conn.execute(UserSession.__table__.delete().where(UserSession.key == key))
+
+    def delete_for_user(self, user_id):
+        with db.engine.begin() as conn:
+            return conn.execute(UserSession.__table__.delete().where(UserSession.user_id == user_id)).rowcount
+
+    def sweep(self, now):
+        with db.engine.begin() as conn:
+            return conn.execute(UserSession.__table__.delete().where(UserSession.expires_at <= now)).rowcount
+
+
+class FilesystemSessionStore:
+    """One JSON file per session under SESSION_FILE_DIR; revoking by user scans every file."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, key)
+
+    def _read(self, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _files(self):
+        with os.scandir(self.path) as it:
+            return [e.path for e in it if e.is_file() and not e.name.endswith(".tmp")]
+
+    def load(self, key, now):
+        record = self._read(self._file(key))
+        if record is None or record["expires_at"] <= now.timestamp():
+            return None
+        return record["data"]
+
+    def save(self, key, data, user_id, expires_at):
+        path = self._file(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"data": data, "user_id": user_id, "expires_at": expires_at.timestamp()}, f)
+        os.replace(tmp, path)  # readers never see a half-written file
+
+    def delete(self, key):
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def _delete_where(self, predicate):
+        deleted = 0
+        for path in self._files():
+            record = self._read(path)
+            if record is not None and predicate(record):
+                try:
+                    os.remove(path)
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+        return deleted
+
+    def delete_for_user(self, user_id):
+        return self._delete_where(lambda r: r["user_id"] == user_id)
+
+    def sweep(self, now):
+        return self._delete_where(lambda r: r["expires_at"] <= now.timestamp())
+
+
+# -----------------------------
+# Session interface
+# -----------------------------
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface that keeps the data in a store and an opaque ID in the cookie.
+
+    Requests for static files get no session at all, and the store is only
+    written when the session changed. A session lives PERMANENT_SESSION_LIFETIME
+    from its last change, after which `flask sessions sweep` removes it.
+    """
+
+    session_class = ServerSession
+
+    def __init__(self, store):
+        self.store = store
+
+    def _is_static(self, app, request):
+        return app.static_url_path and request.path.startswith(app.static_url_path + "/")
+
+    def open_session(self, app, request):
+        if self._is_static(app, request):
+            return self.make_null_session(app)
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.load(_session_key(sid), datetime.utcnow())
+            if data is not None:
+                return self.session_class(_serializer.loads(data), sid=sid)
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain, path = self.get_cookie_domain(app), self.get_cookie_path(app)
+        secure, samesite = self.get_cookie_secure(app), self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+        if session.rotated_from:
+            self.store.delete(_session_key(session.rotated_from))
+        if not session:
+            if session.modified and (session.sid or session.rotated_from):
+                if session.sid:
+                    self.store.delete(_session_key(session.sid))
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+                response.vary.add("Cookie")
+            return
+        if not session.modified:
+            return
+
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        expires_at = datetime.utcnow() + app.permanent_session_lifetime
+        self.store.save(_session_key(session.sid), _serializer.dumps(dict(session)),
+                        session.get("user_id"), expires_at)
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=httponly, domain=domain, path=path, secure=secure, samesite=samesite)
+        response.vary.add("Cookie")
+
+
+SESSION_STORES = {
+    "database": lambda app: DatabaseSessionStore(),
+    "filesystem": lambda app: FilesystemSessionStore(app.config["SESSION_FILE_DIR"]),
+}
+
+
+def init_app(app):
+    backend = app.config["SESSION_BACKEND"]
+    if backend != "cookie":
+        app.session_interface = ServerSessionInterface(SESSION_STORES[backend](app))
+
+
+def server_side_store():
+    """The app's session store, or None when SESSION_BACKEND is 'cookie'."""
+    return getattr(current_app.session_interface, "store", None)
+
+
+def get_session_store():
+    store = server_side_store()
+    if store is None:
+        raise click.ClickException("SESSION_BACKEND is 'cookie', sessions are not stored server-side")
+    return store
+
+
+def revoke_user_sessions(user_id):
+    """Log a user out everywhere; returns the number of sessions removed."""
+    return get_session_store().delete_for_user(user_id)
+
+
+sessions_cli = AppGroup("sessions", help="Server-side session commands.")
+
+@sessions_cli.command("sweep")
+def sessions_sweep_command():
+    """Delete expired sessions (run from cron)."""
+    deleted = get_session_store().sweep(datetime.utcnow())
+    print(f"[SESSION] Removed {deleted} expired session(s)")
+
+@sessions_cli.command("revoke")
+@click.argument("email")
+def sessions_revoke_command(email):
+    """Log the user with EMAIL out of every session."""
+    u = User.query.filter_by(email=email.strip().lower()).first()
+    if u is None:
+        raise click.ClickException(f"no user {email}")
+    print(f"[SESSION] Revoked {revoke_user_sessions(u.id)} session(s) of {u.email}")
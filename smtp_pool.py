@@ -0,0 +1,99 @@
+import smtplib
+import threading
+import time
+
+
+class SMTPPool:
+    """Keeps authenticated SMTP connections open and reuses them across messages.
+
+    A connection is handed out to one sender at a time. Connections idle for
+    longer than idle_timeout are probed with NOOP before reuse, and each one is
+    retired after max_messages sends because most relays cap messages per session.
+    """
+
+    def __init__(self, host, port=587, user=None, password=None, starttls=True,
+                 timeout=15, max_idle=2, max_messages=100, idle_timeout=60):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self._idle = []  # [(conn, sent_count, last_used)]
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                conn.starttls()
+            if self.user:
+                conn.login(self.user, self.password or "")
+        except Exception:
+            self._close(conn)
+            raise
+        return conn
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _acquire(self):
+        while True:
+            with self._lock:
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                return self._connect(), 0
+            conn, sent, last_used = entry
+            if time.monotonic() - last_used < self.idle_timeout:
+                return conn, sent
+            try:
+                if conn.noop()[0] == 250:
+                    return conn, sent
+            except (smtplib.SMTPException, OSError):  # a dropped socket raises OSError
+                pass
+            self._close(conn)
+
+    def _release(self, conn, sent):
+        if sent < self.max_messages:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append((conn, sent, time.monotonic()))
+                    return
+        self._close(conn)
+
+    def send(self, msg):
+        """Send one message on a pooled connection, reconnecting once if the server hung up."""
+        for attempt in range(2):
+            conn, sent = self._acquire()
+            try:
+                conn.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self._close(conn)
+                if attempt:
+                    raise
+                continue
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+                # rejected message, the session itself is still usable
+                self._release(conn, sent + 1)
+                raise
+            except Exception:
+                self._close(conn)
+                raise
+            self._release(conn, sent + 1)
+            return
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._close(conn)
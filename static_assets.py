@@ -0,0 +1,126 @@
+import mimetypes
+import os
+import re
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import with_appcontext
+from markupsafe import Markup
+
+from assets import build_manifest, load_manifest
+from bundle import CRITICAL_CSS, SITE_CSS, SITE_JS, build_bundle
+from http_cache import make_etag
+
+
+# -----------------------------
+# Static assets (fingerprinting, precompression)
+# -----------------------------
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# uploads named by sha256 (see store_event_image) never change content either
+CONTENT_ADDRESSED_UPLOAD = re.compile(r"^uploads/(derived/)?[0-9a-f]{64}[.-]")
+
+def load_asset_manifest(app):
+    manifest = {}
+    if app.config["ASSET_FINGERPRINTING"] and not app.debug:
+        manifest = load_manifest(app.static_folder)
+    app.extensions["asset_manifest"] = manifest  # "css/style.css" -> "css/style.<hash>.css"
+    app.extensions["asset_sources"] = {v: k for k, v in manifest.items()}
+    app.extensions["asset_manifest_hash"] = make_etag(*sorted(manifest.items()))
+
+def fingerprint_static_urls(endpoint, values):
+    asset_manifest = current_app.extensions["asset_manifest"]
+    if endpoint == "static" and asset_manifest:
+        fingerprinted = asset_manifest.get(values.get("filename"))
+        if fingerprinted:
+            values["filename"] = fingerprinted
+
+def serve_static(filename):
+    """Static view: maps fingerprinted names back and serves .br/.gz siblings when accepted."""
+    source = current_app.extensions["asset_sources"].get(filename)
+    if source is None:
+        resp = current_app.send_static_file(filename)
+        if CONTENT_ADDRESSED_UPLOAD.match(filename):
+            resp.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return resp
+    mimetype = mimetypes.guess_type(source)[0] or "application/octet-stream"
+    resp = None
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(current_app.static_folder, source + suffix)):
+            resp = send_from_directory(current_app.static_folder, source + suffix, mimetype=mimetype)
+            resp.headers["Content-Encoding"] = encoding
+            break
+    if resp is None:
+        resp = send_from_directory(current_app.static_folder, source, mimetype=mimetype)
+    resp.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+@click.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    """Build the CSS/JS bundle, fingerprint static assets and write .gz/.br siblings."""
+    sizes = build_bundle(current_app.static_folder)
+    for rel, size in sizes.items():
+        print(f"[ASSETS] {rel}: {size // 1024} KB")
+    manifest = build_manifest(current_app.static_folder)
+    print(f"[ASSETS] Fingerprinted {len(manifest)} file(s); restart the app to serve them")
+
+# -----------------------------
+# Self-hosted CSS/JS bundle
+# -----------------------------
+# Templates call bundle_styles()/bundle_scripts() instead of linking the CDN.
+# With static/dist built, first paint only needs the inlined critical CSS; the
+# full stylesheet is preloaded and applied without blocking, and the script is
+# deferred. Both go through url_for, so they get fingerprinted names.
+BOOTSTRAP_CDN_CSS = (
+    '<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet"'
+    ' integrity="sha384-T3c6CoIi6uLrA9TneNEoa7RxnatzjcDSCmG1MXxSR1GAsXEV/Dwwykc2MPK8M2HN" crossorigin="anonymous">'
+)
+BOOTSTRAP_CDN_JS = (
+    '<script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js"'
+    ' integrity="sha384-C6RzsynM9kWDrMNeT87bh95OGNyZPhcTNXj1NW7RuBCsyN/o0jlpcV8Qyq46cDfL"'
+    ' crossorigin="anonymous"></script>'
+)
+
+_critical_css = {"key": None, "text": None}
+
+def critical_css():
+    """Inlined CSS from static/dist, or None when the bundle is disabled or not built."""
+    if not current_app.config["SELF_HOSTED_BUNDLE"]:
+        return None
+    path = os.path.join(current_app.static_folder, CRITICAL_CSS)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _critical_css["key"] != (path, mtime):
+        with open(path, encoding="utf-8") as f:
+            _critical_css["text"] = f.read()
+        _critical_css["key"] = (path, mtime)
+    return _critical_css["text"]
+
+def asset_version():
+    """Identifies the asset build a rendered page points at (manifest and inlined CSS).
+
+    Goes into page ETags and render-cache keys, so after a build clients stop
+    revalidating HTML that links to fingerprinted names no longer served.
+    """
+    critical_mtime = _critical_css["key"][1] if critical_css() is not None else None
+    return f"{current_app.extensions['asset_manifest_hash']}:{critical_mtime}"
+
+def bundle_styles():
+    critical = critical_css()
+    if critical is None:
+        style_url = url_for("static", filename="css/style.css")
+        return Markup(f'{BOOTSTRAP_CDN_CSS}\n<link rel="stylesheet" href="{style_url}">')
+    href = url_for("static", filename=SITE_CSS)
+    return Markup(
+        f"<style>{critical}</style>\n"
+        f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        f'<noscript><link rel="stylesheet" href="{href}"></noscript>'
+    )
+
+def bundle_scripts():
+    if critical_css() is None:
+        return Markup(BOOTSTRAP_CDN_JS)
+    return Markup(f'<script src="{url_for("static", filename=SITE_JS)}" defer></script>')
@@ -11,7 +11,8 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from main import app, db, User, Event
+from main import create_app
+from extensions import db
 
 
 @pytest.fixture(scope="session")
@@ -21,21 +22,23 @@ def _tmp_db_path():
     os.close(fd)
     yield path
     # Clean up temporary file after the test session
-    try:
-        os.remove(path)
-    except OSError:
-        pass
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
 
 
 @pytest.fixture()
 def client(_tmp_db_path):
-    """Provide a Flask test client with a temporary isolated database."""
-    app.config.update(
-        TESTING=True,
-        SQLALCHEMY_DATABASE_URI=f"sqlite:///{_tmp_db_path}",
-        WTF_CSRF_ENABLED=False,
-        SERVER_NAME="localhost",
-    )
+    """Provide a Flask test client for a fresh app with a temporary isolated database."""
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{_tmp_db_path}",
+        "WTF_CSRF_ENABLED": False,
+        "SERVER_NAME": "localhost",
+        "MIGRATE_ON_START": True,
+    })
 
     with app.app_context():
         # Recreate tables for a clean test environment
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+# Suffix of files taken out of service while the delete of their row commits
+RETIRED_SUFFIX = ".retired"
+
+
+def store_stream(stream, folder):
+    """Copy an upload stream into a temp file in folder while hashing it.
+
+    The stream is written in CHUNK_SIZE pieces, so the upload is never held in
+    memory. Returns (sha256, size, tmp_path); the caller moves the temp file
+    into place with place_file() once it holds a reference to the hash.
+    """
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size, tmp_path
+    except BaseException:
+        discard_file(tmp_path)
+        raise
+
+
+def place_file(tmp_path, target):
+    """Move a stored temp file to target, or drop it if the same content is already there."""
+    if os.path.exists(target):
+        os.remove(tmp_path)
+    else:
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600; static files must be world-readable
+        os.replace(tmp_path, target)
+
+
+def discard_file(tmp_path):
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+def retire_files(paths):
+    """Rename existing paths out of the way; returns the ones renamed, for restore/remove."""
+    retired = []
+    for path in paths:
+        try:
+            os.replace(path, path + RETIRED_SUFFIX)
+        except FileNotFoundError:
+            continue
+        retired.append(path)
+    return retired
+
+
+def restore_files(retired):
+    for path in retired:
+        os.replace(path + RETIRED_SUFFIX, path)
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,19 @@
+# Entry point for production servers, e.g.
+#
+#     gunicorn --preload -w 8 wsgi:app
+#
+# Behind nginx (or any reverse proxy) also set PROXY_FIX_X_FOR=1, so the rate
+# limits see each client's address rather than the proxy's.
+#
+# With --preload the app (routes, templates, models) is built once in the
+# master process and the workers share those pages copy-on-write.
+import gc
+
+from main import create_app
+
+app = create_app()
+
+# Everything allocated so far lives as long as the process; moving it out of the
+# collector's generations stops each worker's GC passes from touching (and so
+# copying) the shared pages.
+gc.freeze()